@@ -11,12 +11,15 @@ async def main():
     parser = argparse.ArgumentParser(description='Process recent podcast episodes')
     parser.add_argument('-m', type=int, default=60,
                       help='Number of minutes to look back for new episodes (default: 60)')
+    parser.add_argument('-c', type=int, default=4,
+                      help='Number of episodes to process concurrently (default: 4)')
     
     args = parser.parse_args()
     
     try:
-        # Set time window for Lambda handler
+        # Set time window and concurrency for Lambda handler
         os.environ['CHECK_MINUTES'] = str(args.m)
+        os.environ['MAX_CONCURRENT_EPISODES'] = str(args.c)
         
         # Run batch processing
         result = await lambda_handler()
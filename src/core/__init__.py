@@ -1,11 +1,20 @@
 from .analyzer import PodcastAnalyzer, AnalyzerError, InvalidAnalysisError
-from .prompts import PREANALYSIS_PROMPT, INTERVIEW_PROMPT, BANTER_PROMPT
+from .prompts import (
+    PREANALYSIS_STATIC_PREFIX, PREANALYSIS_EPISODE_DETAILS, PREANALYSIS_CHUNK_DETAILS, PREANALYSIS_BATCH_DETAILS,
+    WRITING_SYSTEM_PROMPT, INTERVIEW_PROMPT, BANTER_PROMPT, WRITING_AUDIO_ATTACHED, WRITING_NO_AUDIO
+)
 
 __all__ = [
     'PodcastAnalyzer',
     'AnalyzerError',
     'InvalidAnalysisError',
-    'PREANALYSIS_PROMPT',
+    'PREANALYSIS_STATIC_PREFIX',
+    'PREANALYSIS_EPISODE_DETAILS',
+    'PREANALYSIS_CHUNK_DETAILS',
+    'PREANALYSIS_BATCH_DETAILS',
+    'WRITING_SYSTEM_PROMPT',
     'INTERVIEW_PROMPT',
-    'BANTER_PROMPT'
+    'BANTER_PROMPT',
+    'WRITING_AUDIO_ATTACHED',
+    'WRITING_NO_AUDIO'
 ] 
\ No newline at end of file
@@ -1,19 +1,99 @@
-import hashlib
+import bisect
+import functools
 import logging
 import os
-from datetime import datetime
-from typing import Optional, List, Tuple
+import random
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext, suppress
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple, Union
 import asyncio
 
 import google.generativeai as genai
+from google.api_core.exceptions import (
+    AlreadyExists, NotFound, PermissionDenied, ResourceExhausted, ServiceUnavailable
+)
+from google.generativeai.protos import Candidate
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 
-from .prompts import BACKGROUND, PREANALYSIS_PROMPT, INTERVIEW_PROMPT, BANTER_PROMPT
+from .prompts import (
+    BACKGROUND, PREANALYSIS_STATIC_PREFIX, PREANALYSIS_EPISODE_DETAILS, PREANALYSIS_CHUNK_DETAILS, PREANALYSIS_BATCH_DETAILS,
+    WRITING_SYSTEM_PROMPT, INTERVIEW_PROMPT, BANTER_PROMPT, WRITING_AUDIO_ATTACHED, WRITING_NO_AUDIO
+)
+from utils.file_hash import sha256_file
 from utils.logging_config import setup_logging
+from utils.response_cache import ResponseCache
 
 logger = logging.getLogger(__name__)
 setup_logging()
 
+@functools.lru_cache(maxsize=1024)
+def _hash_file(file_path: str, inode: int, mtime_ns: int, size: int) -> str:
+    """Calculate SHA-256 hash of a file.
+    
+    inode, mtime_ns and size are only part of the cache key, so a modified or
+    replaced file is rehashed.
+    """
+    return sha256_file(file_path)
+
+# Dedicated pools so minutes-long Gemini calls never starve hashing, and neither
+# grows the default executor. The I/O pool is sized above the upload and generation
+# limits combined, so cache and file writes never queue behind network calls
+_IO_POOL = ThreadPoolExecutor(max_workers=32, thread_name_prefix="lettercast-io")
+_HASH_POOL = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="hash")
+
+# Model parameters, shared read-only by every analyzer
+PREANALYSIS_CONFIG = MappingProxyType({
+    "temperature": 0.5,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 8192,
+})
+
+WRITING_CONFIG = MappingProxyType({
+    "temperature": 0.8,
+    "top_p": 0.95,
+    "top_k": 80,
+    "max_output_tokens": 8192,
+})
+
+# Gemini models live for the whole process (e.g. a warm Lambda container)
+_MODEL_CACHE: Dict[Tuple[str, str, Tuple, Optional[str]], genai.GenerativeModel] = {}
+
+# API key the SDK's global configuration was last set to
+_configured_api_key: Optional[str] = None
+
+def _configure(api_key: str) -> None:
+    """Configure the Gemini SDK, skipping the global update when the key is unchanged"""
+    global _configured_api_key
+    if _configured_api_key != api_key:
+        genai.configure(api_key=api_key)
+        _configured_api_key = api_key
+
+def _get_model(
+    api_key: str,
+    model_name: str,
+    generation_config: Mapping,
+    system_instruction: Optional[str] = None
+) -> genai.GenerativeModel:
+    """Return a cached GenerativeModel, creating it on first use"""
+    key = (api_key, model_name, tuple(sorted(generation_config.items())), system_instruction)
+    if key not in _MODEL_CACHE:
+        # Only models with a system prompt are built with one
+        kwargs = {}
+        if system_instruction is not None:
+            kwargs['system_instruction'] = system_instruction
+        _MODEL_CACHE[key] = genai.GenerativeModel(
+            model_name=model_name,
+            generation_config=dict(generation_config),
+            **kwargs
+        )
+    return _MODEL_CACHE[key]
+
 class AnalyzerError(Exception):
     """Base exception for analyzer-related errors"""
     pass
@@ -31,54 +111,365 @@ class PodcastAnalyzer:
     }
     
     REQUIRED_SECTIONS = ['TLDR', 'The big picture', 'Highlights', 'Quoted', 'Worth your time if']
+    REQUIRED_SECTIONS_PATTERN = re.compile('|'.join(map(re.escape, REQUIRED_SECTIONS)))
+    # Follow-up requests for sections a newsletter left out, before accepting it as is
+    MAX_SECTION_RETRIES = 1
     
-    def __init__(self, api_key):
-        """Initialize analyzer with Gemini API credentials"""
+    # Output token budget for a pre-analysis: the fixed sections plus an allowance
+    # per requested item, capped at the model's configured maximum
+    PREANALYSIS_BASE_TOKENS = 1500
+    PREANALYSIS_TOKENS_PER_MOMENT = 120
+    PREANALYSIS_TOKENS_PER_QUOTE = 80
+    PREANALYSIS_TOKENS_PER_HOOK = 40
+    # Thinking models spend output tokens reasoning before they answer, so their
+    # budget reserves this much on top of the answer
+    PREANALYSIS_THINKING_TOKENS = 4096
+    
+    # Output cap for batched and retried pre-analysis requests, by model. The thinking
+    # model accepts far longer responses than preanalysis_config allows, so its batches
+    # hold several chunk analyses on top of its reasoning; other models keep the
+    # configured cap
+    EXTENDED_MAX_OUTPUT_TOKENS = {"gemini-2.0-flash-thinking-exp": 16384}
+    
+    # Delimits each chunk's analysis in a batched pre-analysis response
+    BATCH_CHUNK_MARKER = re.compile(r'^<<<CHUNK (\d+)>>>[ \t]*$', re.MULTILINE)
+    
+    # Default maximum concurrent Gemini file uploads and generate_content calls per analyzer
+    MAX_CONCURRENT_UPLOADS = 6
+    MAX_CONCURRENT_GENERATIONS = 4
+    
+    # Attempts and maximum backoff in seconds for rate-limited or unavailable Gemini calls
+    MAX_RETRIES = 5
+    RETRY_MAX_DELAY = 30
+    
+    # Cached Gemini files this close to expiring are looked up again
+    REMOTE_FILE_EXPIRY_MARGIN = timedelta(hours=1)
+    
+    # Upper bounds in MB of the file-size bins used to group batch episodes
+    BATCH_SIZE_BINS_MB = (20, 80)
+    
+    def __init__(
+        self,
+        api_key,
+        max_concurrent_uploads: Optional[int] = None,
+        max_concurrent_generations: Optional[int] = None,
+        batch_chunk_analysis: bool = False,
+        response_cache: Optional[ResponseCache] = None,
+        include_full_audio_in_final: bool = False
+    ):
+        """Initialize analyzer with Gemini API credentials.
+        
+        Args:
+            api_key: Gemini API key
+            max_concurrent_uploads: Limit on simultaneous file uploads (default MAX_CONCURRENT_UPLOADS)
+            max_concurrent_generations: Limit on simultaneous generate_content calls, defaulting
+                to LETTERCAST_MAX_CONCURRENCY or MAX_CONCURRENT_GENERATIONS
+            batch_chunk_analysis: Pre-analyze consecutive chunks of an episode together, in as
+                few requests as the output limit allows, falling back to one request per
+                chunk for any incomplete response
+            response_cache: Cache for pre-analysis responses; None disables caching
+            include_full_audio_in_final: Also give the writing pass the chunk audio of chunked
+                episodes, instead of relying on the chunk analyses alone
+        """
         logger.info("Initializing PodcastAnalyzer")
         
         if not api_key:
             logger.error("GEMINI_API_KEY not provided")
             raise ValueError("GEMINI_API_KEY not provided")
             
-        genai.configure(api_key=api_key)
+        _configure(api_key)
         logger.info("Gemini API configured successfully")
         
-        # Configure model parameters
-        preanalysis_config = {
-            "temperature": 0.5,
-            "top_p": 0.95,
-            "top_k": 40,
-            "max_output_tokens": 8192,
-        }
+        self.preanalysis_config = PREANALYSIS_CONFIG
+        self.writing_config = WRITING_CONFIG
         
-        writing_config = {
-            "temperature": 0.8,
-            "top_p": 0.95,
-            "top_k": 80,
-            "max_output_tokens": 8192,
+        # Models are created on first use (see the properties below), so an episode
+        # that never needs one, e.g. the thinking model for a banter show, skips it
+        self._api_key = api_key
+        
+        # The pre-analysis prefix is identical for every request, so it is sent as its
+        # own leading part where Gemini can reuse it across calls
+        self._preanalysis_prefix = PREANALYSIS_STATIC_PREFIX.format(background=BACKGROUND)
+        # The newsletter rubric goes to the writing model as its system instruction,
+        # leaving only the episode materials in each request
+        self._writing_system_prompt = WRITING_SYSTEM_PROMPT.format(background=BACKGROUND)
+        # Writing templates are split around the pre-analyses, which are joined
+        # straight into the prompt instead of being copied through format()
+        self._writing_templates = {
+            category: tuple(template.split('{pre_analyses}'))
+            for category, template in (('interview', INTERVIEW_PROMPT), ('banter', BANTER_PROMPT))
         }
         
-        # Initialize models for different tasks
-        self.preanalysis_model = genai.GenerativeModel(
-            model_name="gemini-2.0-flash-thinking-exp",
-            generation_config=preanalysis_config,
-        )
-        self.writing_model = genai.GenerativeModel(
-            model_name="gemini-2.0-flash-exp",
-            generation_config=writing_config,
+        # Sizes of hashed audio files in bytes, keyed by path
+        self.file_sizes: Dict[str, int] = {}
+        
+        # SHA-256 -> Gemini file, for files already found or uploaded by this analyzer
+        self._remote_files: Dict[str, genai.types.File] = {}
+        
+        # Uploads and generations are limited separately so long uploads don't hold
+        # back generate_content calls for files that are already stored
+        self.max_concurrent_uploads = max_concurrent_uploads or self.MAX_CONCURRENT_UPLOADS
+        self.max_concurrent_generations = max_concurrent_generations or int(
+            os.getenv("LETTERCAST_MAX_CONCURRENCY", self.MAX_CONCURRENT_GENERATIONS)
         )
-        logger.info("Gemini models initialized")
+        
+        self.batch_chunk_analysis = batch_chunk_analysis
+        self.response_cache = response_cache
+        self.include_full_audio_in_final = include_full_audio_in_final
+        
+        # Shared concurrency limits, recreated for each event loop the analyzer runs on
+        self._semaphores: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = {}
+    
+    @functools.cached_property
+    def preanalysis_model(self) -> genai.GenerativeModel:
+        """Thinking model for pre-analyzing long interviews"""
+        return _get_model(self._api_key, "gemini-2.0-flash-thinking-exp", self.preanalysis_config)
+    
+    @functools.cached_property
+    def fast_model(self) -> genai.GenerativeModel:
+        """Faster model for every other pre-analysis"""
+        return _get_model(self._api_key, "gemini-2.0-flash-lite", self.preanalysis_config)
+    
+    @functools.cached_property
+    def writing_model(self) -> genai.GenerativeModel:
+        """Model that writes the newsletter from the pre-analyses"""
+        return _get_model(self._api_key, "gemini-2.0-flash-exp", self.writing_config, self._writing_system_prompt)
     
     def _get_file_hash(self, file_path: str) -> str:
-        """Calculate SHA-256 hash of a file"""
-        with open(file_path, "rb") as f:
-            return hashlib.sha256(f.read()).hexdigest()
+        """Calculate SHA-256 hash of a file, reusing earlier results for unchanged files"""
+        stat = os.stat(file_path)
+        self.file_sizes[file_path] = stat.st_size
+        # Absolute path, so the same file reached through different relative paths hashes once
+        return _hash_file(os.path.abspath(file_path), stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    
+    async def _get_file_hash_async(self, file_path: str) -> str:
+        """Calculate SHA-256 hash of a file without blocking the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(_HASH_POOL, self._get_file_hash, file_path)
+    
+    async def _run_io(self, fn, *args, **kwargs):
+        """Run a blocking I/O call (Gemini SDK, cache or file writes) on the I/O pool"""
+        return await asyncio.get_running_loop().run_in_executor(_IO_POOL, functools.partial(fn, *args, **kwargs))
+    
+    def _get_semaphore(self, name: str, limit: int) -> asyncio.Semaphore:
+        """Return the named semaphore for the running event loop.
+        
+        The analyzer can outlive an event loop (e.g. across warm Lambda invocations),
+        and asyncio primitives must not be shared between loops.
+        """
+        loop = asyncio.get_running_loop()
+        entry = self._semaphores.get(name)
+        if entry is None or entry[0] is not loop:
+            entry = (loop, asyncio.Semaphore(limit))
+            self._semaphores[name] = entry
+        return entry[1]
+    
+    def _is_expiring(self, audio_file: genai.types.File) -> bool:
+        """Check whether a cached Gemini file expires before an episode could finish with it"""
+        expiration = getattr(audio_file, 'expiration_time', None)
+        if not isinstance(expiration, datetime):
+            return False
+        return expiration - datetime.now(timezone.utc) < self.REMOTE_FILE_EXPIRY_MARGIN
+    
+    @staticmethod
+    def _remote_file_name(file_hash: str) -> str:
+        """Return the deterministic Gemini file name for a SHA-256 hex digest.
+        
+        Gemini names allow at most 40 lowercase alphanumerics or dashes, so the
+        digest is truncated to 33 characters after the prefix.
+        """
+        return f"files/sha256-{file_hash[:33]}"
+    
+    async def _get_or_upload_file(self, audio_path: str, label: Optional[str] = None) -> genai.types.File:
+        """Return the Gemini file for audio_path, uploading it only if not already stored.
+        
+        Uploads are named after their SHA-256, so a stored copy is found with a
+        single get_file call instead of listing every file in the project.
+        """
+        file_hash = await self._get_file_hash_async(audio_path)
+        audio_file = self._remote_files.get(file_hash)
+        if audio_file is not None and self._is_expiring(audio_file):
+            # Gemini deletes files after 48 hours; look the audio up again
+            del self._remote_files[file_hash]
+            audio_file = None
+        if audio_file is not None:
+            logger.info("Found %s in Gemini storage", label or 'audio')
+            return audio_file
+        
+        name = self._remote_file_name(file_hash)
+        try:
+            audio_file = await self._run_io(genai.get_file, name)
+            logger.info("Found %s in Gemini storage", label or 'audio')
+        except (NotFound, PermissionDenied):
+            # Gemini reports files that were never created as PermissionDenied as well as NotFound
+            # Uploads are bound by RTT, not CPU, so run several at once up to the limit
+            async with self._get_semaphore('upload', self.max_concurrent_uploads):
+                logger.info("Uploading audio %s to Gemini...", label or '')
+                try:
+                    # Run upload on the I/O pool
+                    audio_file = await self._run_io(genai.upload_file, audio_path, name=name)
+                except AlreadyExists:
+                    # Another task or process uploaded the same audio in the meantime
+                    audio_file = await self._run_io(genai.get_file, name)
+        
+        self._remote_files[file_hash] = audio_file
+        return audio_file
+    
+    async def _upload_chunks(self, chunk_paths: List[str]) -> List[genai.types.File]:
+        """Resolve or upload all chunks concurrently, bounded by the upload limit"""
+        return await asyncio.gather(*(
+            self._get_or_upload_file(path, f"chunk {i+1}/{len(chunk_paths)}")
+            for i, path in enumerate(chunk_paths)
+        ))
+    
+    async def _prehash_files(self, file_paths: List[str]) -> None:
+        """Hash files in parallel so later lookups hit the hash cache.
+        
+        hashlib releases the GIL while hashing, so each worker uses a separate core.
+        Files that cannot be read are skipped here and reported by the normal code path.
+        """
+        await asyncio.gather(
+            *(self._get_file_hash_async(path) for path in file_paths),
+            return_exceptions=True
+        )
+    
+    async def _generate_with_retries(self, model: genai.GenerativeModel, fn, *args, **kwargs):
+        """Run a blocking generation call on the I/O pool, backing off on rate limits and outages.
+        
+        The generation slot is held until fn returns, so a streamed response keeps
+        counting against the limit until its last chunk has arrived.
+        """
+        for attempt in range(self.MAX_RETRIES):
+            try:
+                # Bound calls across all episodes to stay under Gemini rate limits
+                async with self._get_semaphore('generation', self.max_concurrent_generations):
+                    return await self._run_io(fn, *args, **kwargs)
+            except (ResourceExhausted, ServiceUnavailable) as e:
+                if attempt == self.MAX_RETRIES - 1:
+                    raise
+                delay = min(2 ** attempt, self.RETRY_MAX_DELAY) + random.random()
+                logger.warning("%s unavailable (%s), retrying in %.1fs", model.model_name, e.__class__.__name__, delay)
+                await asyncio.sleep(delay)
+    
+    async def _generate_content(
+        self,
+        model: genai.GenerativeModel,
+        contents: List,
+        generation_config: Optional[Dict] = None
+    ) -> genai.types.GenerateContentResponse:
+        """Call generate_content in a worker thread, backing off on rate limits and outages"""
+        return await self._generate_with_retries(
+            model,
+            model.generate_content,
+            contents,
+            generation_config=generation_config,
+            safety_settings=self.SAFETY_SETTINGS
+        )
+    
+    async def _generate_to_file(
+        self,
+        model: genai.GenerativeModel,
+        contents: List,
+        output_path: str,
+        append: bool = False
+    ) -> str:
+        """Stream a response into output_path as it is generated, returning its full text.
+        
+        Rate limits and outages raised partway through the stream are retried like
+        any other, and each attempt rewrites what the previous one wrote.
+        With append=True the response is added after a blank line instead of
+        replacing the file.
+        """
+        start = await self._run_io(os.path.getsize, output_path) if append else 0
+        return await self._generate_with_retries(model, self._write_stream, model, contents, output_path, start)
+    
+    def _get_size_bin(self, audio_path: str) -> int:
+        """Return the index of the BATCH_SIZE_BINS_MB bin an audio file falls into"""
+        try:
+            size = self.file_sizes.get(audio_path) or os.path.getsize(audio_path)
+        except (OSError, TypeError):
+            # Missing files fail validation in process_podcast, bin them with the shortest
+            return 0
+        return bisect.bisect_right(self.BATCH_SIZE_BINS_MB, size / (1024 * 1024))
+    
+    def create_stage_semaphores(self, max_concurrency: int = 4) -> List[Dict[str, asyncio.Semaphore]]:
+        """Create separate pre-analysis and writing limits for each file-size bin.
+        
+        Returns:
+            One dict per BATCH_SIZE_BINS_MB bin, holding the preanalysis_semaphore and
+            writing_semaphore arguments of process_podcast
+        """
+        return [
+            {
+                'preanalysis_semaphore': asyncio.Semaphore(max_concurrency),
+                'writing_semaphore': asyncio.Semaphore(max_concurrency)
+            }
+            for _ in range(len(self.BATCH_SIZE_BINS_MB) + 1)
+        ]
+    
+    def get_stage_semaphores(
+        self,
+        stage_semaphores: List[Dict[str, asyncio.Semaphore]],
+        audio_path: str
+    ) -> Dict[str, asyncio.Semaphore]:
+        """Return the stage limits from create_stage_semaphores for audio_path's size bin"""
+        return stage_semaphores[self._get_size_bin(audio_path)]
+    
+    def _output_token_cap(self, model: genai.GenerativeModel) -> int:
+        """Return the largest max_output_tokens a pre-analysis request to model may use"""
+        return self.EXTENDED_MAX_OUTPUT_TOKENS.get(model.model_name, self.preanalysis_config["max_output_tokens"])
+    
+    @staticmethod
+    def _is_truncated(response: genai.types.GenerateContentResponse) -> bool:
+        """Check whether a response was cut off by its max_output_tokens"""
+        return bool(response.candidates) and response.candidates[0].finish_reason == Candidate.FinishReason.MAX_TOKENS
+    
+    @staticmethod
+    def _is_thinking_model(model: genai.GenerativeModel) -> bool:
+        """Check whether a model's reasoning tokens count against its output limit"""
+        return "thinking" in model.model_name
+    
+    def _preanalysis_token_budget(
+        self,
+        moment_count: int,
+        quote_count: int,
+        hook_count: int,
+        thinking: bool = False
+    ) -> int:
+        """Return max_output_tokens for a pre-analysis with the requested item counts"""
+        budget = (
+            self.PREANALYSIS_BASE_TOKENS
+            + moment_count * self.PREANALYSIS_TOKENS_PER_MOMENT
+            + quote_count * self.PREANALYSIS_TOKENS_PER_QUOTE
+            + hook_count * self.PREANALYSIS_TOKENS_PER_HOOK
+        )
+        if thinking:
+            budget += self.PREANALYSIS_THINKING_TOKENS
+        return min(budget, self.preanalysis_config["max_output_tokens"])
+    
+    def _missing_sections(self, text: str) -> List[str]:
+        """Return the required sections that do not appear in text, in order"""
+        found = set(self.REQUIRED_SECTIONS_PATTERN.findall(text))
+        return [section for section in self.REQUIRED_SECTIONS if section not in found]
     
     def validate_analysis(self, analysis: str) -> None:
         """Check if analysis contains all required sections"""
-        missing = [section for section in self.REQUIRED_SECTIONS if section not in analysis]
+        missing = self._missing_sections(analysis)
         if missing:
-            logger.warning(f"Analysis missing required sections: {', '.join(missing)}")
+            logger.warning("Analysis missing required sections: %s", ', '.join(missing))
+    
+    def _select_preanalysis_model(self, category: str, chunked: bool) -> genai.GenerativeModel:
+        """Use the thinking model only for long interviews, where the extra reasoning pays off"""
+        if category == 'interview' and chunked:
+            return self.preanalysis_model
+        return self.fast_model
+    
+    def _format_episode_details(self, name: str, prompt_addition: str, episode_description: str = "") -> str:
+        """Format the episode-level part of the pre-analysis prompt, shared by every chunk"""
+        return PREANALYSIS_EPISODE_DETAILS.format(
+            name=name,
+            prompt_addition=prompt_addition,
+            episode_description=episode_description
+        )
     
     async def analyze_audio(
         self, 
@@ -89,7 +480,10 @@ class PodcastAnalyzer:
         chunk_context: Optional[str] = None,
         moment_count: int = 10,
         quote_count: int = 15,
-        hook_count: int = 6
+        hook_count: int = 6,
+        audio_file: Optional[genai.types.File] = None,
+        episode_details: Optional[str] = None,
+        model: Optional[genai.GenerativeModel] = None
     ) -> str:
         """Generate detailed analysis of a podcast episode or chunk.
         
@@ -101,61 +495,191 @@ class PodcastAnalyzer:
             moment_count: Number of moments to analyze (fewer for chunks)
             quote_count: Number of quotes to extract (fewer for chunks)
             hook_count: Number of hooks to generate (fewer for chunks)
+            audio_file: Gemini file for audio_path if it was already uploaded
+            episode_details: Episode details already formatted by _format_episode_details
+            model: Model to analyze with (default preanalysis_model)
             
         Returns:
             Structured analysis text
         """
         try:
-            # Check if file already exists in Gemini storage
-            file_hash = self._get_file_hash(audio_path)
-            
-            # Run file listing in thread pool since it's synchronous
-            existing_files = await asyncio.to_thread(genai.list_files)
-            
-            for existing_file in existing_files:
-                gemini_hash = existing_file.sha256_hash.decode() if isinstance(existing_file.sha256_hash, bytes) else existing_file.sha256_hash
-                if gemini_hash == file_hash:
-                    logger.info(f"Found {chunk_context or 'audio'} in {self.preanalysis_model.model_name} storage")
-                    audio_file = existing_file
-                    break
-            else:
-                logger.info(f"Uploading audio {chunk_context or ''} to {self.preanalysis_model.model_name}...")
-                # Run upload in thread pool
-                audio_file = await asyncio.to_thread(genai.upload_file, audio_path)
-            
-            # Get initial insights from audio
-            formatted_prompt = PREANALYSIS_PROMPT.format(
-                name=name,
-                prompt_addition=prompt_addition,
-                background=BACKGROUND,
-                episode_description=episode_description,
-                chunk_context=chunk_context or "an episode",
+            # Get initial insights from audio, with the shared instructions first
+            model = model or self.preanalysis_model
+            if episode_details is None:
+                episode_details = self._format_episode_details(name, prompt_addition, episode_description)
+            chunk_details = PREANALYSIS_CHUNK_DETAILS.format(
+                chunk_context=chunk_context or "the full episode",
                 moment_count=moment_count,
                 quote_count=quote_count,
                 hook_count=hook_count
             )
+            generation_config = {
+                "max_output_tokens": self._preanalysis_token_budget(
+                    moment_count, quote_count, hook_count, thinking=self._is_thinking_model(model)
+                )
+            }
             
-            # Run generate_content in thread pool
-            preanalysis_response = await asyncio.to_thread(
-                self.preanalysis_model.generate_content,
-                [formatted_prompt, audio_file],
-                safety_settings=self.SAFETY_SETTINGS
-            )
+            # Reuse an earlier response for the same audio, prompt and model settings
+            cache_key = None
+            if self.response_cache is not None:
+                cache_key = ResponseCache.make_key(
+                    model.model_name,
+                    repr(sorted({**self.preanalysis_config, **generation_config}.items())),
+                    self._preanalysis_prefix,
+                    episode_details,
+                    chunk_details,
+                    await self._get_file_hash_async(audio_path)
+                )
+                cached_analysis = await self._run_io(self.response_cache.get, cache_key)
+                if cached_analysis is not None:
+                    logger.info("Using cached analysis for %s", chunk_context or 'audio')
+                    return cached_analysis
+            
+            if audio_file is None:
+                audio_file = await self._get_or_upload_file(audio_path, chunk_context)
+            
+            contents = [self._preanalysis_prefix, episode_details, chunk_details, audio_file]
+            preanalysis_response = await self._generate_content(model, contents, generation_config=generation_config)
+            
+            # A truncated analysis loses its later sections without any error, so it is
+            # requested again with the model's full output cap
+            truncated = self._is_truncated(preanalysis_response)
+            output_cap = self._output_token_cap(model)
+            if truncated and generation_config["max_output_tokens"] < output_cap:
+                logger.warning("Analysis of %s hit its %d-token limit, retrying with %d",
+                               chunk_context or 'audio', generation_config["max_output_tokens"], output_cap)
+                preanalysis_response = await self._generate_content(
+                    model, contents, generation_config={"max_output_tokens": output_cap}
+                )
+                truncated = self._is_truncated(preanalysis_response)
+            
+            if truncated:
+                # Kept for this run, but not cached, so a later run asks again
+                logger.warning("Analysis of %s is truncated at %d tokens", chunk_context or 'audio', output_cap)
+            elif cache_key is not None:
+                await self._run_io(self.response_cache.set, cache_key, preanalysis_response.text)
             
             return preanalysis_response.text
                 
         except Exception as e:
             if not isinstance(e, AnalyzerError):
-                logger.error(f"Analysis failed: {str(e)}", exc_info=True)
-                raise AnalyzerError(f"Analysis failed: {str(e)}") from None
+                logger.error("Analysis failed: %s", e)
+                raise AnalyzerError(f"Analysis failed: {str(e)}") from e
             raise
 
+    def _batch_group_size(self, model: genai.GenerativeModel) -> int:
+        """Return how many chunk analyses fit in one batched request's output limit"""
+        available = self._output_token_cap(model)
+        if self._is_thinking_model(model):
+            # One reasoning allowance covers the whole request
+            available -= self.PREANALYSIS_THINKING_TOKENS
+        return available // self._preanalysis_token_budget(7, 8, 3)
+    
+    async def _analyze_chunks_batched(
+        self,
+        chunk_paths: List[str],
+        audio_files: Optional[List[genai.types.File]],
+        name: str,
+        prompt_addition: str,
+        episode_description: str = "",
+        model: Optional[genai.GenerativeModel] = None
+    ) -> List[Optional[str]]:
+        """Analyze the chunks of an episode in as few requests as the output limit allows.
+        
+        Chunks are grouped so every group's analyses fit within max_output_tokens,
+        and the groups are requested concurrently. Without audio_files, a group's
+        chunks are only uploaded if its response is not cached.
+        
+        Returns:
+            List of analysis texts, one per chunk, with None for the chunks of any
+            group whose response was incomplete (e.g. it was truncated)
+        """
+        model = model or self.preanalysis_model
+        group_size = self._batch_group_size(model)
+        thinking_tokens = self.PREANALYSIS_THINKING_TOKENS if self._is_thinking_model(model) else 0
+        episode_details = self._format_episode_details(name, prompt_addition, episode_description)
+        logger.info("Analyzing %d chunks in requests of up to %d chunks", len(chunk_paths), group_size)
+        
+        async def analyze_group(start: int) -> List[Optional[str]]:
+            """Analyze the chunks from index start in one request"""
+            parts = range(start + 1, min(start + group_size, len(chunk_paths)) + 1)
+            batch_details = PREANALYSIS_BATCH_DETAILS.format(
+                first_part=parts[0],
+                last_part=parts[-1],
+                chunk_count=len(chunk_paths),
+                chunk_minutes=20,
+                moment_count=7,
+                quote_count=8,
+                hook_count=3
+            )
+            generation_config = {
+                "max_output_tokens": len(parts) * self._preanalysis_token_budget(7, 8, 3) + thinking_tokens
+            }
+            
+            # Reuse an earlier response for the same chunks, prompt and model settings
+            cache_key = None
+            if self.response_cache is not None:
+                chunk_hashes = await asyncio.gather(
+                    *(self._get_file_hash_async(chunk_paths[part - 1]) for part in parts)
+                )
+                cache_key = ResponseCache.make_key(
+                    model.model_name,
+                    repr(sorted({**self.preanalysis_config, **generation_config}.items())),
+                    self._preanalysis_prefix,
+                    episode_details,
+                    batch_details,
+                    *chunk_hashes
+                )
+                cached_text = await self._run_io(self.response_cache.get, cache_key)
+                if cached_text is not None:
+                    logger.info("Using cached analysis for parts %d-%d", parts[0], parts[-1])
+                    return self._split_batched_analyses(cached_text, parts) or [None] * len(parts)
+            
+            if audio_files is not None:
+                group_files = [audio_files[part - 1] for part in parts]
+            else:
+                group_files = await asyncio.gather(*(
+                    self._get_or_upload_file(chunk_paths[part - 1], f"chunk {part}/{len(chunk_paths)}")
+                    for part in parts
+                ))
+            
+            response = await self._generate_content(
+                model,
+                [self._preanalysis_prefix, episode_details, batch_details, *group_files],
+                generation_config=generation_config
+            )
+            analyses = self._split_batched_analyses(response.text, parts)
+            if analyses is None:
+                return [None] * len(parts)
+            if cache_key is not None:
+                await self._run_io(self.response_cache.set, cache_key, response.text)
+            return analyses
+        
+        groups = await asyncio.gather(*(
+            analyze_group(start) for start in range(0, len(chunk_paths), group_size)
+        ))
+        return [analysis for group in groups for analysis in group]
+    
+    @classmethod
+    def _split_batched_analyses(cls, text: str, parts: range) -> Optional[List[str]]:
+        """Split a batched pre-analysis response into per-chunk analyses, or None if incomplete"""
+        # split() yields [preamble, number, analysis, number, analysis, ...]
+        split = cls.BATCH_CHUNK_MARKER.split(text)
+        numbers, analyses = split[1::2], split[2::2]
+        if numbers != [str(part) for part in parts]:
+            return None
+        if any('</INSIGHTS' not in analysis for analysis in analyses):
+            return None
+        return [analysis.strip() for analysis in analyses]
+    
     async def analyze_chunks(
         self,
         chunk_paths: List[str],
         name: str,
         prompt_addition: str,
-        episode_description: str = ""
+        episode_description: str = "",
+        audio_files: Optional[List[genai.types.File]] = None,
+        model: Optional[genai.GenerativeModel] = None
     ) -> List[str]:
         """Analyze multiple chunks of a podcast episode in parallel.
         
@@ -164,15 +688,34 @@ class PodcastAnalyzer:
             name: Podcast name
             prompt_addition: Additional podcast context
             episode_description: Episode description
+            audio_files: Gemini files for chunk_paths, in order, if already uploaded
+            model: Model to analyze with (default preanalysis_model)
             
         Returns:
             List of analysis texts, one per chunk
         """
-        async def analyze_chunk(i: int, chunk_path: str) -> Tuple[int, str]:
-            """Analyze a single chunk asynchronously. Returns (chunk_index, analysis)"""
-            logger.info(f"Analyzing chunk {i+1}/{len(chunk_paths)}: {chunk_path}")
+        # Without audio_files, each chunk is uploaded only when its analysis is not
+        # cached; the analyses run concurrently, so their uploads still overlap
+        model = model or self.preanalysis_model
+        chunk_analyses: List[Optional[str]] = [None] * len(chunk_paths)
+        # Batching only saves requests when at least two chunk analyses fit in one response
+        if self.batch_chunk_analysis and len(chunk_paths) > 1 and self._batch_group_size(model) > 1:
+            chunk_analyses = await self._analyze_chunks_batched(
+                chunk_paths, audio_files, name, prompt_addition, episode_description, model
+            )
+            if None not in chunk_analyses:
+                return chunk_analyses
+            logger.warning("Batched chunk analysis was incomplete, analyzing %d chunks one by one",
+                           chunk_analyses.count(None))
+        
+        # Every chunk shares the same episode details, so format them once
+        episode_details = self._format_episode_details(name, prompt_addition, episode_description)
+        
+        async def analyze_chunk(i: int, chunk_path: str) -> None:
+            """Analyze a single chunk asynchronously, storing it at its chunk index"""
+            logger.info("Analyzing chunk %d/%d: %s", i + 1, len(chunk_paths), chunk_path)
             
-            chunk_analysis = await self.analyze_audio(
+            chunk_analyses[i] = await self.analyze_audio(
                 audio_path=chunk_path,
                 name=name,
                 prompt_addition=prompt_addition,
@@ -180,32 +723,167 @@ class PodcastAnalyzer:
                 chunk_context=f"Part {i+1} of {len(chunk_paths)}, starting from minute {i*20}",
                 moment_count=7,
                 quote_count=8,
-                hook_count=3
+                hook_count=3,
+                audio_file=audio_files[i] if audio_files is not None else None,
+                episode_details=episode_details,
+                model=model
             )
-            logger.info(f"Completed analysis of chunk {i+1}/{len(chunk_paths)}")
-            return (i, chunk_analysis)
+            logger.info("Completed analysis of chunk %d/%d", i + 1, len(chunk_paths))
 
-        # Create tasks for all chunks and run them concurrently
-        tasks = [analyze_chunk(i, chunk_path) for i, chunk_path in enumerate(chunk_paths)]
-        chunk_results = await asyncio.gather(*tasks)
+        # Only chunks without an analysis from a batched request are left
+        pending = [i for i, analysis in enumerate(chunk_analyses) if analysis is None]
+        
+        # A single chunk needs no task fan-out
+        if len(pending) == 1:
+            await analyze_chunk(pending[0], chunk_paths[pending[0]])
+            return chunk_analyses
         
-        # Sort by chunk index and extract just the analyses
-        chunk_analyses = [analysis for _, analysis in sorted(chunk_results, key=lambda x: x[0])]
+        # Run all chunks concurrently; the first failure cancels the remaining calls
+        try:
+            async with asyncio.TaskGroup() as tg:
+                for i in pending:
+                    tg.create_task(analyze_chunk(i, chunk_paths[i]))
+        except ExceptionGroup as eg:
+            raise eg.exceptions[0]
         
         return chunk_analyses
+
+    async def analyze_audio_batch(
+        self,
+        items: List[Dict],
+        max_concurrency: int = 4
+    ) -> List[Union[str, Exception]]:
+        """Process several episodes concurrently.
+        
+        Gemini calls are latency-bound, so running episodes side by side gives
+        near-linear speedups until the concurrency limit is reached. Each stage is
+        limited separately, so one episode's newsletter can be written while the
+        next episode is still in pre-analysis. Episodes are also grouped by file
+        size, and each group gets its own limits so short episodes are not stuck
+        behind long ones.
+        
+        Args:
+            items: Keyword arguments for process_podcast, one dict per episode
+            max_concurrency: Maximum number of episodes per size group in each stage
+            
+        Returns:
+            List of newsletters in input order. Episodes that failed are returned
+            as the raised exception instead of a newsletter.
+        """
+        # Hash every file up front, in parallel, instead of one by one inside each episode
+        file_paths = []
+        for item in items:
+            if item.get('audio_path'):
+                file_paths.append(item['audio_path'])
+            file_paths.extend(item.get('chunk_paths') or [])
+        await self._prehash_files(file_paths)
+        
+        stage_semaphores = self.create_stage_semaphores(max_concurrency)
+        
+        logger.info("Processing batch of %d episodes (max %d concurrent per stage and size group)", len(items), max_concurrency)
+        return await asyncio.gather(
+            *(
+                self.process_podcast(
+                    **item,
+                    **self.get_stage_semaphores(stage_semaphores, item.get('audio_path'))
+                )
+                for item in items
+            ),
+            return_exceptions=True
+        )
   
     def save_newsletter(self, newsletter_text: str, output_path: Optional[str] = None) -> str:
         """Save newsletter to file, using default path if none provided"""
         output_path = output_path or f"newsletters/lettercast_{datetime.now().strftime('%Y%m%d')}.md"
         
         try:
-            logger.info(f"Saving newsletter to: {output_path}")
-            with open(output_path, 'w') as f:
-                f.write(newsletter_text)
+            logger.info("Saving newsletter to: %s", output_path)
+            # Write a temporary file and move it into place, so a crash mid-write never
+            # leaves a partial newsletter at output_path
+            tmp_path = self._make_temp_path(output_path)
+            try:
+                # Encode once and hand the bytes straight to write(2), with no file object
+                data = memoryview(newsletter_text.encode('utf-8'))
+                fd = os.open(tmp_path, os.O_WRONLY)
+                try:
+                    # os.write may write less than asked, so continue from where it stopped
+                    while data:
+                        data = data[os.write(fd, data):]
+                finally:
+                    os.close(fd)
+                os.replace(tmp_path, output_path)
+            except Exception:
+                with suppress(FileNotFoundError):
+                    os.unlink(tmp_path)
+                raise
             return output_path
         except Exception as e:
-            logger.error(f"Error saving newsletter: {str(e)}", exc_info=True)
-            raise AnalyzerError(f"Failed to save newsletter: {str(e)}")
+            logger.error("Error saving newsletter: %s", e)
+            raise AnalyzerError(f"Failed to save newsletter: {str(e)}") from e
+    
+    @staticmethod
+    def _make_temp_path(output_path: str) -> str:
+        """Create an empty temporary file in output_path's directory, readable like a saved newsletter"""
+        directory = Path(output_path).parent
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{Path(output_path).name}.", suffix=".tmp")
+        os.close(fd)
+        os.chmod(tmp_path, 0o644)
+        return tmp_path
+    
+    def _write_stream(
+        self,
+        model: genai.GenerativeModel,
+        contents: List,
+        output_path: str,
+        start: int = 0
+    ) -> str:
+        """Generate a streamed response into output_path chunk by chunk, returning the full text.
+        
+        The response is written from byte offset start, after a blank line when
+        start is not 0, replacing anything an earlier attempt left past start.
+        """
+        logger.info("Streaming newsletter to: %s", output_path)
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        response = model.generate_content(contents, safety_settings=self.SAFETY_SETTINGS, stream=True)
+        with open(output_path, 'r+b' if start else 'wb') as f:
+            f.truncate(start)
+            f.seek(start)
+            if start:
+                f.write(b'\n\n')
+            for chunk in response:
+                # The final chunk may only carry the finish reason
+                if chunk.parts:
+                    f.write(chunk.text.encode('utf-8'))
+                    f.flush()
+        return response.text
+    
+    async def _write_missing_sections(
+        self,
+        content_parts: List,
+        newsletter: str,
+        missing: List[str],
+        output_path: Optional[str] = None
+    ) -> str:
+        """Ask the writing model to continue a newsletter with the sections it left out.
+        
+        Returns:
+            Only the added text, which is also appended to output_path when given
+        """
+        logger.warning("Newsletter missing sections %s, requesting them", ', '.join(missing))
+        contents = [
+            {'role': 'user', 'parts': content_parts},
+            {'role': 'model', 'parts': [newsletter]},
+            {'role': 'user', 'parts': [f"Continue; include the missing sections: {', '.join(missing)}."]},
+        ]
+        if output_path:
+            return await self._generate_to_file(self.writing_model, contents, output_path, append=True)
+        response = await self._generate_content(self.writing_model, contents)
+        return response.text
+    
+    async def save_newsletter_async(self, newsletter_text: str, output_path: Optional[str] = None) -> str:
+        """Save newsletter to file in a worker thread, using default path if none provided"""
+        return await self._run_io(self.save_newsletter, newsletter_text, output_path)
     
     async def process_podcast(
         self,
@@ -216,12 +894,15 @@ class PodcastAnalyzer:
         publish_date: datetime,
         prompt_addition: str = "",
         episode_description: str = "",
-        chunk_paths: Optional[List[str]] = None
+        chunk_paths: Optional[List[str]] = None,
+        preanalysis_semaphore: Optional[asyncio.Semaphore] = None,
+        writing_semaphore: Optional[asyncio.Semaphore] = None,
+        output_path: Optional[str] = None
     ) -> str:
         """Process podcast from audio to newsletter.
         
         Args:
-            audio_path: Full audio file path (used only for final context)
+            audio_path: Full audio file path (used for final context when there are no chunks)
             name: Podcast name
             title: Episode title
             category: Podcast category (interview/banter)
@@ -229,6 +910,10 @@ class PodcastAnalyzer:
             prompt_addition: Additional podcast context
             episode_description: Episode description
             chunk_paths: List of paths to audio chunks. If empty, will analyze full audio directly.
+            preanalysis_semaphore: Optional limit on episodes in the pre-analysis stage
+            writing_semaphore: Optional limit on episodes in the newsletter writing stage
+            output_path: If given, the newsletter is streamed to disk as it is generated and
+                moved to this path once complete
             
         Returns:
             Formatted newsletter text
@@ -258,71 +943,127 @@ class PodcastAnalyzer:
             
             # Log missing context
             if not prompt_addition:
-                logger.warning(f"No prompt addition found for podcast: {name}")
+                logger.warning("No prompt addition found for podcast: %s", name)
             if not episode_description:
-                logger.warning(f"No episode description found for podcast: {name}")
+                logger.warning("No episode description found for podcast: %s", name)
             
             # Get analyses based on whether we have chunks
-            if chunk_paths and len(chunk_paths) > 0:
-                logger.info(f"Processing {len(chunk_paths)} chunks using {self.preanalysis_model.model_name}...")
-                analyses = await self.analyze_chunks(
-                    chunk_paths=chunk_paths,
-                    **analysis_params
-                )
-            else:
-                logger.info("No chunks provided or episode too short; analyzing full audio using {self.preanalysis_model.model_name}...")
-                analyses = [await self.analyze_audio(
-                    audio_path=audio_path,
-                    **analysis_params
-                )]
-                logger.info("Completed full audio analysis")
+            chunked = bool(chunk_paths)
+            preanalysis_model = self._select_preanalysis_model(category, chunked)
+            async with preanalysis_semaphore or nullcontext():
+                if chunked:
+                    logger.info("Processing %d chunks using %s...", len(chunk_paths), preanalysis_model.model_name)
+                    # Chunks are uploaded only for analyses that are not cached, and the
+                    # full episode never has to be uploaded
+                    analyses = await self.analyze_chunks(
+                        chunk_paths=chunk_paths,
+                        model=preanalysis_model,
+                        **analysis_params
+                    )
+                else:
+                    logger.info("No chunks provided or episode too short; analyzing full audio using %s...", preanalysis_model.model_name)
+                    # analyze_audio uploads only on a cache miss; the writing pass
+                    # below then finds the file in _remote_files instead of re-uploading
+                    analyses = [await self.analyze_audio(
+                        audio_path=audio_path,
+                        model=preanalysis_model,
+                        **analysis_params
+                    )]
+                    logger.info("Completed full audio analysis")
             
-            # Combine all pre-analyses into a single string
-            combined_analyses = "\n\n".join(analyses)
+            # Chunks cover the whole episode, so their analyses stand in for the
+            # audio unless it is explicitly requested
+            if not chunked:
+                writing_audio_paths = [audio_path]
+            elif self.include_full_audio_in_final:
+                writing_audio_paths = chunk_paths
+            else:
+                writing_audio_paths = []
             
             # Select prompt based on podcast format and include pre-analyses
-            if category == 'interview':
-                prompt = INTERVIEW_PROMPT.format(
-                    prompt_addition=prompt_addition,
-                    episode_description=episode_description,
-                    background=BACKGROUND,
-                    pre_analyses=combined_analyses
-                )
-            elif category == 'banter':
-                prompt = BANTER_PROMPT.format(
-                    prompt_addition=prompt_addition,
-                    episode_description=episode_description,
-                    background=BACKGROUND,
-                    pre_analyses=combined_analyses
-                )
-            else:
-                logger.warning(f"Unknown podcast category: {category}, defaulting to interview prompt")
-                prompt = INTERVIEW_PROMPT.format(
-                    prompt_addition=prompt_addition,
-                    episode_description=episode_description,
-                    background=BACKGROUND,
-                    pre_analyses=combined_analyses
-                )
+            prefix, suffix = self._writing_templates.get(category, (None, None))
+            if prefix is None:
+                logger.warning("Unknown podcast category: %s, defaulting to interview prompt", category)
+                prefix, suffix = self._writing_templates['interview']
+            episode_fields = {
+                'audio_materials': WRITING_AUDIO_ATTACHED if writing_audio_paths else WRITING_NO_AUDIO,
+                'prompt_addition': prompt_addition,
+                'episode_description': episode_description
+            }
+            separated_analyses = [part for analysis in analyses for part in ("\n\n", analysis)][1:]
+            prompt = "".join([
+                prefix.format(**episode_fields),
+                *separated_analyses,
+                suffix.format(**episode_fields)
+            ])
             
             logger.debug("Using formatted prompt for final generation:\n%s", prompt)
             
-            # Generate newsletter using prompt and full audio only
-            logger.info("Generating final newsletter...")
-            audio_file = await asyncio.to_thread(genai.upload_file, audio_path)
-            content_parts = [prompt, audio_file]
+            # Reuse an earlier newsletter written from the same prompt and audio
+            cache_key = None
+            if self.response_cache is not None:
+                audio_hashes = await asyncio.gather(*map(self._get_file_hash_async, writing_audio_paths))
+                cache_key = ResponseCache.make_key(
+                    self.writing_model.model_name,
+                    repr(sorted(self.writing_config.items())),
+                    self._writing_system_prompt,
+                    prompt,
+                    *audio_hashes
+                )
+                cached_newsletter = await self._run_io(self.response_cache.get, cache_key)
+                if cached_newsletter is not None:
+                    logger.info("Using cached newsletter for %s", title)
+                    if output_path:
+                        await self._run_io(self.save_newsletter, cached_newsletter, output_path)
+                    return cached_newsletter
             
-            writing_response = await asyncio.to_thread(
-                self.writing_model.generate_content,
-                content_parts,
-                safety_settings=self.SAFETY_SETTINGS
-            )
+            # Generate newsletter from the prompt and any audio it needs
+            async with writing_semaphore or nullcontext():
+                logger.info("Generating final newsletter...")
+                if not chunked:
+                    content_parts = [prompt, await self._get_or_upload_file(audio_path, "full audio")]
+                elif self.include_full_audio_in_final:
+                    # Chunks uploaded for their analyses are found in _remote_files
+                    content_parts = [prompt, *await self._upload_chunks(chunk_paths)]
+                else:
+                    content_parts = [prompt]
+                
+                # Stream into a temporary file next to output_path and move it into place
+                # once the newsletter is complete, so a failed generation or follow-up
+                # never leaves a partial newsletter at output_path
+                tmp_path = await self._run_io(self._make_temp_path, output_path) if output_path else None
+                try:
+                    if tmp_path:
+                        newsletter = await self._generate_to_file(self.writing_model, content_parts, tmp_path)
+                    else:
+                        writing_response = await self._generate_content(self.writing_model, content_parts)
+                        newsletter = writing_response.text
+                    
+                    # A dropped section costs one short continuation instead of a full rewrite
+                    for _ in range(self.MAX_SECTION_RETRIES):
+                        missing = self._missing_sections(newsletter)
+                        if not missing:
+                            break
+                        addition = await self._write_missing_sections(content_parts, newsletter, missing, tmp_path)
+                        newsletter = f"{newsletter}\n\n{addition}"
+                    
+                    self.validate_analysis(newsletter)
+                    
+                    if tmp_path:
+                        await self._run_io(os.replace, tmp_path, output_path)
+                        tmp_path = None
+                finally:
+                    if tmp_path:
+                        with suppress(FileNotFoundError):
+                            os.unlink(tmp_path)
             
-            self.validate_analysis(writing_response.text)
+            if cache_key is not None:
+                await self._run_io(self.response_cache.set, cache_key, newsletter)
             
-            return writing_response.text
+            return newsletter
             
         except Exception as e:
             if not isinstance(e, AnalyzerError):
-                logger.error(f"Failed to process podcast: {str(e)}", exc_info=True)
-                raise AnalyzerError(f"Failed to process podcast: {str(e)}") from None
+                logger.error("Failed to process podcast: %s", e)
+                raise AnalyzerError(f"Failed to process podcast: {str(e)}") from e
             raise
\ No newline at end of file
@@ -5,6 +5,7 @@ from typing import Dict, List
 
 import pytz
 import requests
+from dateutil import parser
 from lxml import etree
 from database.models import Podcast
 
@@ -33,7 +34,6 @@ def parse_datetime(date_str: str) -> datetime:
                 continue
         
         # Fallback to dateutil parser
-        from dateutil import parser
         dt = parser.parse(date_str)
         if dt.tzinfo is None:
             dt = dt.replace(tzinfo=pytz.UTC)
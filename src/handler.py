@@ -1,8 +1,11 @@
+import asyncio
 import json
 import logging
 import os
+import re
+from contextlib import nullcontext
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from dotenv import load_dotenv
 import pytz
@@ -17,7 +20,7 @@ from database.config import AsyncSessionLocal
 from database.models import Podcast
 from utils.audio_transformer import get_audio_length, chunk_audio
 from utils.logging_config import setup_logging
-from utils.temp_file_context import download_audio_context
+from utils.temp_file_context import async_download_audio_context
 
 logger = logging.getLogger(__name__)
 
@@ -30,22 +33,16 @@ if not API_KEY:
 
 GLOBAL_ANALYZER = PodcastAnalyzer(API_KEY)
 
-def cleanup_files(downloaded_file, transformed_audio, context, result_path):
-    """Clean up temporary files, respecting Lambda context."""
-    if transformed_audio and os.path.exists(transformed_audio):
-        os.unlink(transformed_audio)
-    if downloaded_file and os.path.exists(downloaded_file):
-        os.unlink(downloaded_file)
-    if context is not None and result_path and os.path.exists(result_path):
-        os.unlink(result_path)
+# Opening and closing NEWSLETTER tags, removed in a single pass
+NEWSLETTER_TAG_PATTERN = re.compile(r'</?NEWSLETTER>')
 
-async def load_podcasts(db: AsyncSession) -> List[Podcast]:
-    """Fetch all podcasts from database."""
-    try:
-        return await crud.list_podcasts(db)
-    except Exception as e:
-        logger.error(f"Failed to load podcasts: {e}")
-        raise
+def clean_newsletter(newsletter: str) -> str:
+    """Strip markdown code fences and XML tags from the newsletter."""
+    newsletter = newsletter.strip()
+    if newsletter.startswith('```') and newsletter.endswith('```'):
+        # Drop the opening and closing fence lines without splitting every line
+        newsletter = newsletter.partition('\n')[2].rpartition('\n')[0]
+    return NEWSLETTER_TAG_PATTERN.sub('', newsletter).strip()
 
 async def find_unprocessed_episodes(db: AsyncSession, podcast: Podcast, rss_episodes: List[Dict], minutes: int) -> List[Dict]:
     """Find new episodes within time window.
@@ -72,7 +69,7 @@ async def find_unprocessed_episodes(db: AsyncSession, podcast: Podcast, rss_epis
             try:
                 publish_date = datetime.fromisoformat(publish_date.replace('Z', '+00:00'))
             except ValueError as e:
-                logger.error(f"Failed to parse publish date {publish_date}: {e}")
+                logger.error("Failed to parse publish date %s: %s", publish_date, e)
                 continue
                 
         time_diff = now - publish_date
@@ -94,7 +91,9 @@ async def find_unprocessed_episodes(db: AsyncSession, podcast: Podcast, rss_epis
     return unprocessed
 
 async def process_episode(
-    db: AsyncSession, podcast: Podcast, episode: Dict
+    db: AsyncSession, podcast: Podcast, episode: Dict,
+    audio_semaphore: Optional[asyncio.Semaphore] = None,
+    stage_semaphores: Optional[List[Dict[str, asyncio.Semaphore]]] = None
 ) -> Dict:
     """Process single episode using context managers.
     
@@ -102,24 +101,28 @@ async def process_episode(
         db: Database session
         podcast: Parent podcast
         episode: Episode data from RSS
+        audio_semaphore: Optional limit on concurrent ffmpeg work
+        stage_semaphores: Optional per-size-bin limits on the pre-analysis and writing
+            stages, from PodcastAnalyzer.create_stage_semaphores
         
     Returns:
         Processing result with status
     """
     try:
         logger.info("Downloading episode: %s from %s", episode['title'], podcast.name)
-        with download_audio_context(episode['url']) as downloaded_file:
+        async with async_download_audio_context(episode['url']) as downloaded_file:
             # Get audio length and create chunks if needed
-            audio_length = get_audio_length(downloaded_file)
-            chunk_minutes = 20
-            
-            if audio_length <= chunk_minutes:
-                logger.info(f"Episode length ({audio_length:.1f}m) <= chunk size ({chunk_minutes}m), skipping chunking")
-                chunk_paths = []
-            else:
-                logger.info(f"Creating {chunk_minutes}-minute chunks...")
-                chunk_paths = chunk_audio(downloaded_file, chunk_minutes)
-                logger.info(f"Created {len(chunk_paths)} chunks")
+            async with audio_semaphore or nullcontext():
+                audio_length = await asyncio.to_thread(get_audio_length, downloaded_file)
+                chunk_minutes = 20
+                
+                if audio_length <= chunk_minutes:
+                    logger.info("Episode length (%.1fm) <= chunk size (%sm), skipping chunking", audio_length, chunk_minutes)
+                    chunk_paths = []
+                else:
+                    logger.info("Creating %s-minute chunks...", chunk_minutes)
+                    chunk_paths = await asyncio.to_thread(chunk_audio, downloaded_file, chunk_minutes)
+                    logger.info("Created %d chunks", len(chunk_paths))
             
             # Process the podcast with full audio and chunks (if any)
             newsletter = await GLOBAL_ANALYZER.process_podcast(
@@ -130,15 +133,11 @@ async def process_episode(
                 publish_date=datetime.fromisoformat(episode['publish_date']) if isinstance(episode['publish_date'], str) else episode['publish_date'],
                 prompt_addition=podcast.prompt_addition,
                 episode_description=episode.get('episode_description', ""),
-                chunk_paths=chunk_paths
+                chunk_paths=chunk_paths,
+                **(GLOBAL_ANALYZER.get_stage_semaphores(stage_semaphores, downloaded_file) if stage_semaphores else {})
             )
             
-            # Strip markdown code fences and XML tags from the newsletter
-            newsletter = newsletter.strip()
-            if newsletter.startswith('```') and newsletter.endswith('```'):
-                newsletter_lines = newsletter.split('\n')
-                newsletter = '\n'.join(newsletter_lines[1:-1])
-            newsletter = newsletter.replace('<NEWSLETTER>', '').replace('</NEWSLETTER>', '').strip()
+            newsletter = clean_newsletter(newsletter)
             
             episode_data = {
                 'podcast_id': podcast.id,
@@ -182,10 +181,13 @@ async def process_episode(
             'error': str(e)
         }
 
-async def process_episode_concurrent(podcast: Podcast, episode: Dict) -> Dict:
+async def process_episode_concurrent(
+    podcast: Podcast, episode: Dict, audio_semaphore: Optional[asyncio.Semaphore] = None,
+    stage_semaphores: Optional[List[Dict[str, asyncio.Semaphore]]] = None
+) -> Dict:
     """Process episode with dedicated database session."""
     async with AsyncSessionLocal() as local_db:
-        return await process_episode(local_db, podcast, episode)
+        return await process_episode(local_db, podcast, episode, audio_semaphore, stage_semaphores)
 
 async def lambda_handler(event=None, context=None):
     """Process new podcast episodes from the last hour.
@@ -214,7 +216,8 @@ async def lambda_handler(event=None, context=None):
         failed_processes = 0
         errors = []
 
-        # Process each podcast one at a time
+        # Collect new episodes across all podcasts
+        pending = []
         for podcast in podcasts:
             # First get RSS episodes
             rss_episodes = get_recent_episodes(podcast)['episodes']
@@ -224,28 +227,50 @@ async def lambda_handler(event=None, context=None):
                 unprocessed = await find_unprocessed_episodes(db, podcast, rss_episodes, minutes)
 
             total_new_episodes += len(unprocessed)
+            pending.extend((podcast, episode) for episode in unprocessed)
+
+        # Process all new episodes concurrently. Audio processing is CPU-bound, so it
+        # gets its own limit to keep one long ffmpeg run from stalling the batch.
+        max_concurrency = int(os.getenv('MAX_CONCURRENT_EPISODES', '4'))
+        episode_semaphore = asyncio.Semaphore(max_concurrency)
+        audio_semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+        # Pre-analysis and writing are limited separately for each file-size bin, so one
+        # episode's newsletter is written while the next is still in pre-analysis and
+        # short episodes are not queued behind long ones
+        stage_concurrency = int(os.getenv('MAX_CONCURRENT_PER_STAGE', '2'))
+        stage_semaphores = GLOBAL_ANALYZER.create_stage_semaphores(stage_concurrency)
+
+        async def process_pending(podcast: Podcast, episode: Dict) -> Dict:
+            async with episode_semaphore:
+                logger.info("Starting to process episode: %s from %s", episode.get('title'), podcast.name)
+                try:
+                    return await process_episode_concurrent(podcast, episode, audio_semaphore, stage_semaphores)
+                except Exception as e:
+                    return {
+                        'status': 'error',
+                        'title': episode.get('title', 'Unknown'),
+                        'error': str(e)
+                    }
 
-            if unprocessed:
-                logger.info(f"Processing {len(unprocessed)} episodes for podcast: {podcast.name}")
-                for episode in unprocessed:
-                    logger.info(f"Starting to process episode: {episode.get('title')} from {podcast.name}")
-                    try:
-                        result = await process_episode_concurrent(podcast, episode)
-                        if result.get('status') == 'success':
-                            successful_processes += 1
-                        else:
-                            failed_processes += 1
-                            errors.append({
-                                'podcast': podcast.name,
-                                'episode': result.get('title', 'Unknown'),
-                                'error': result.get('error', 'Unknown error')
-                            })
-                    except Exception as e:
-                        failed_processes += 1
-                        errors.append({
-                            'podcast': podcast.name,
-                            'error': str(e)
-                        })
+        if pending:
+            logger.info("Processing %d episodes (max %d concurrent)", len(pending), max_concurrency)
+        async with asyncio.TaskGroup() as tg:
+            tasks = [
+                tg.create_task(process_pending(podcast, episode))
+                for podcast, episode in pending
+            ]
+
+        for (podcast, episode), task in zip(pending, tasks):
+            result = task.result()
+            if result.get('status') == 'success':
+                successful_processes += 1
+            else:
+                failed_processes += 1
+                errors.append({
+                    'podcast': podcast.name,
+                    'episode': result.get('title', 'Unknown'),
+                    'error': result.get('error', 'Unknown error')
+                })
 
         summary = {
             'time_window_minutes': minutes,
@@ -267,7 +292,7 @@ async def lambda_handler(event=None, context=None):
 
         return {
             'statusCode': 200,
-            'body': json.dumps(summary, default=str)
+            'body': json.dumps(summary, separators=(',', ':'), default=str)
         }
 
     except Exception as e:
@@ -278,7 +303,7 @@ async def lambda_handler(event=None, context=None):
                 'error': str(e),
                 'time_window_minutes': minutes if 'minutes' in locals() else None,
                 'run_timestamp': datetime.now(pytz.UTC).isoformat()
-            }, default=str)
+            }, separators=(',', ':'), default=str)
         }
 
 async def trigger_email_notification(episode_id: str, podcast_name: str, episode_title: str) -> None:
@@ -297,22 +322,22 @@ async def trigger_email_notification(episode_id: str, podcast_name: str, episode
     lambda_client = boto3.client('lambda', region_name='us-east-1')
     
     try:
-        logger.info(f"Preparing to invoke email function for episode: {episode_title}")
+        logger.info("Preparing to invoke email function for episode: %s", episode_title)
         payload = {
             'episode_id': str(episode_id),
             'podcast_name': podcast_name,
             'episode_title': episode_title
         }
-        logger.debug(f"Email function payload: {payload}")
+        logger.debug("Email function payload: %s", payload)
         
         response = lambda_client.invoke(
             FunctionName=os.getenv('EMAIL_FUNCTION_NAME', 'SendEmailFunction'),
             InvocationType='Event',
-            Payload=json.dumps(payload)
+            Payload=json.dumps(payload, separators=(',', ':'))
         )
-        logger.info(f"Successfully triggered email function for episode {episode_id} of podcast {podcast_name}")
-        logger.debug(f"Lambda invoke response: {response}")
+        logger.info("Successfully triggered email function for episode %s of podcast %s", episode_id, podcast_name)
+        logger.debug("Lambda invoke response: %s", response)
     except Exception as e:
-        logger.error(f"Failed to trigger email function for episode {episode_id}")
-        logger.error(f"Error details: {str(e)}")
+        logger.error("Failed to trigger email function for episode %s", episode_id)
+        logger.error("Error details: %s", e)
         logger.exception("Full stack trace:")
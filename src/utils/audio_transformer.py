@@ -1,20 +1,61 @@
+import glob
+import hashlib
+import json
 import logging
 import os
+import shutil
+import subprocess
 import tempfile
 import time
+import uuid
+from contextlib import suppress
 from typing import Dict, List, Union, Tuple
 
-from pydub import AudioSegment
-
+from utils.file_hash import sha256_file
 from utils.logging_config import setup_logging
 
 logger = logging.getLogger(__name__)
 setup_logging()
 
+# Transformed audio, keyed by the source contents and target parameters. The cache
+# is pruned to the newest entries within AUDIO_CACHE_MAX_BYTES, and entries unused
+# for AUDIO_CACHE_TTL_SECONDS are dropped, so long-lived hosts do not fill their disk
+AUDIO_CACHE_DIR = os.getenv(
+    "LETTERCAST_AUDIO_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "lettercast-audio-cache")
+)
+AUDIO_CACHE_MAX_BYTES = int(float(os.getenv("LETTERCAST_AUDIO_CACHE_MB", 1024)) * 1024 * 1024)
+AUDIO_CACHE_TTL_SECONDS = 24 * 60 * 60
+
 class AudioTransformationError(Exception):
     """Base exception for audio transformation errors."""
     pass
 
+def _prune_audio_cache() -> None:
+    """Evict expired entries, then the least recently used ones until the cache fits its size limit"""
+    entries = []
+    now = time.time()
+    with os.scandir(AUDIO_CACHE_DIR) as it:
+        for entry in it:
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > AUDIO_CACHE_TTL_SECONDS:
+                with suppress(FileNotFoundError):
+                    os.unlink(entry.path)
+            elif not entry.name.endswith(".tmp"):
+                # Files still being published by another run are left alone
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= AUDIO_CACHE_MAX_BYTES:
+            break
+        with suppress(FileNotFoundError):
+            os.unlink(path)
+        total_size -= size
+
 def get_audio_length(audio_path: str) -> float:
     """Get audio file length in minutes.
     
@@ -28,8 +69,18 @@ def get_audio_length(audio_path: str) -> float:
         AudioTransformationError: If file cannot be loaded or length cannot be determined
     """
     try:
-        audio = AudioSegment.from_file(audio_path)
-        return len(audio) / (1000 * 60)  # Convert milliseconds to minutes
+        # ffprobe reads the duration from the container instead of decoding the audio
+        result = subprocess.run(
+            [
+                "ffprobe", "-v", "error",
+                "-show_entries", "format=duration",
+                "-of", "default=noprint_wrappers=1:nokey=1",
+                audio_path
+            ],
+            check=True,
+            capture_output=True
+        )
+        return float(result.stdout) / 60  # Convert seconds to minutes
     except Exception as e:
         raise AudioTransformationError(f"Failed to get audio length: {str(e)}")
 
@@ -44,41 +95,70 @@ def chunk_audio(audio_path: str, chunk_minutes: int = 20) -> List[str]:
         List of paths to chunked audio files
     """
     try:
-        logger.info(f"Chunking audio file: {audio_path} into {chunk_minutes}-minute segments")
-        
-        # Load audio
-        audio = AudioSegment.from_file(audio_path)
-        
-        # Calculate chunk size in milliseconds
-        chunk_duration_ms = chunk_minutes * 60 * 1000
-        total_duration_ms = len(audio)
+        logger.info("Chunking audio file: %s into %s-minute segments", audio_path, chunk_minutes)
         
-        chunk_paths = []
+        # Chunks are written next to each other in the temp directory under a unique prefix
+        prefix = os.path.join(tempfile.gettempdir(), f"lettercast_{uuid.uuid4().hex}")
         
-        # Create chunks
-        for i, start_ms in enumerate(range(0, total_duration_ms, chunk_duration_ms)):
-            end_ms = min(start_ms + chunk_duration_ms, total_duration_ms)
-            chunk = audio[start_ms:end_ms]
-            
-            # Create temporary file for chunk
-            with tempfile.NamedTemporaryFile(
-                suffix='.mp3',
-                delete=False
-            ) as tmp_file:
-                logger.info(f"Exporting chunk {i+1} ({(end_ms-start_ms)/(1000*60):.1f} minutes)")
-                chunk.export(
-                    tmp_file.name,
-                    format='mp3',
-                    parameters=["-q:a", "9"]
-                )
-                chunk_paths.append(tmp_file.name)
+        # Decode the file once and let ffmpeg's segment muxer cut and encode every chunk
+        subprocess.run(
+            [
+                "ffmpeg", "-y", "-loglevel", "error",
+                "-i", audio_path,
+                "-vn",
+                "-q:a", "9",
+                "-f", "segment",
+                "-segment_time", str(chunk_minutes * 60),
+                "-reset_timestamps", "1",
+                f"{prefix}_%03d.mp3"
+            ],
+            check=True,
+            capture_output=True
+        )
+        chunk_paths = sorted(glob.glob(f"{prefix}_*.mp3"))
         
-        logger.info(f"Created {len(chunk_paths)} chunks")
+        logger.info("Created %d chunks", len(chunk_paths))
         return chunk_paths
         
+    except subprocess.CalledProcessError as e:
+        for path in glob.glob(f"{prefix}_*.mp3"):
+            os.unlink(path)
+        stderr = e.stderr.decode('utf-8', errors='replace').strip()
+        logger.error("Failed to chunk audio: %s", stderr)
+        raise AudioTransformationError(f"Failed to chunk audio: {stderr}") from None
     except Exception as e:
-        logger.error(f"Failed to chunk audio: {str(e)}", exc_info=True)
-        raise AudioTransformationError(f"Failed to chunk audio: {str(e)}") from None
+        logger.error("Failed to chunk audio: %s", e)
+        raise AudioTransformationError(f"Failed to chunk audio: {str(e)}") from e
+
+def _compress_audio(audio_path: str, output_path: str, target_params: Dict) -> None:
+    """Decode, downmix, resample and re-encode audio in a single streamed ffmpeg pass.
+    
+    The decoded samples never pass through Python. output_path is removed on failure.
+    """
+    try:
+        logger.info("Compressing audio with ffmpeg...")
+        subprocess.run(
+            [
+                "ffmpeg", "-y", "-loglevel", "error",
+                "-i", audio_path,
+                "-vn",  # Drop embedded cover art
+                "-ac", str(target_params['channels']),
+                "-ar", str(target_params['frame_rate']),
+                "-q:a", str(target_params['quality']),
+                output_path
+            ],
+            check=True,
+            capture_output=True
+        )
+    except subprocess.CalledProcessError as e:
+        os.unlink(output_path)
+        raise AudioTransformationError(
+            f"Failed to compress audio: {e.stderr.decode('utf-8', errors='replace').strip()}"
+        )
+    except OSError as e:
+        # Typically ffmpeg is not installed or not on PATH
+        os.unlink(output_path)
+        raise AudioTransformationError(f"Failed to run ffmpeg: {str(e)}")
 
 def transform_audio(
     audio_path: str, 
@@ -105,7 +185,7 @@ def transform_audio(
     """
     try:
         start_time = time.time()
-        logger.info(f"Starting audio transformation for: {audio_path}")
+        logger.info("Starting audio transformation for: %s", audio_path)
         
         # Validate input
         if not audio_path:
@@ -121,69 +201,72 @@ def transform_audio(
             'quality': '9'
         }
         
+        # Reuse an earlier transformation of the same audio with the same parameters
+        cache_key = hashlib.sha256(
+            f"{sha256_file(audio_path)}\0{json.dumps(target_params, sort_keys=True)}".encode()
+        ).hexdigest()
+        cache_path = os.path.join(AUDIO_CACHE_DIR, f"{cache_key}.{target_params['format']}")
+        
         # Log original size
         original_size = os.path.getsize(audio_path) / (1024 * 1024)
-        logger.info(f"Original file size: {original_size:.2f} MB")
+        logger.info("Original file size: %.2f MB", original_size)
         
-        try:
-            # Load audio
-            logger.info("Loading audio file...")
-            audio = AudioSegment.from_file(audio_path)
-            logger.info(f"Original audio: {audio.channels} channels, {audio.frame_rate}Hz")
-        except Exception as e:
-            raise AudioTransformationError(f"Failed to load audio file: {str(e)}")
+        fd, output_path = tempfile.mkstemp(suffix=f'.{target_params["format"]}')
+        os.close(fd)
         
+        # Callers own the returned file and may change or delete it, so cache entries
+        # are copied in and out rather than hard-linked, which would share one inode
         try:
-            # Apply optimizations
-            if audio.channels != target_params['channels']:
-                audio = audio.set_channels(target_params['channels'])
-                logger.info(f"Converted to {target_params['channels']} channel(s)")
-            
-            if audio.frame_rate != target_params['frame_rate']:
-                audio = audio.set_frame_rate(target_params['frame_rate'])
-                logger.info(f"Set frame rate to {target_params['frame_rate']}Hz")
-        except Exception as e:
-            raise AudioTransformationError(f"Failed to process audio: {str(e)}")
+            shutil.copyfile(cache_path, output_path)
+            cached = True
+        except FileNotFoundError:
+            # Not cached yet, or pruned by a concurrent run
+            cached = False
+        
+        if cached:
+            logger.info("Using cached transformation")
+            # Mark the entry as recently used so pruning evicts it last
+            with suppress(FileNotFoundError):
+                os.utime(cache_path)
+        else:
+            _compress_audio(audio_path, output_path, target_params)
+            try:
+                # Publish atomically so concurrent runs never see a partial file
+                os.makedirs(AUDIO_CACHE_DIR, exist_ok=True)
+                tmp_cache_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+                shutil.copyfile(output_path, tmp_cache_path)
+                os.replace(tmp_cache_path, cache_path)
+                _prune_audio_cache()
+            except OSError as e:
+                logger.warning("Failed to cache transformed audio: %s", e)
         
         try:
-            # Export optimized file
-            with tempfile.NamedTemporaryFile(
-                suffix=f'.{target_params["format"]}',
-                delete=False
-            ) as tmp_file:
-                logger.info("Exporting compressed audio...")
-                audio.export(
-                    tmp_file.name,
-                    format=target_params['format'],
-                    parameters=["-q:a", target_params['quality']]
-                )
-                
-                # Log results
-                compressed_size = os.path.getsize(tmp_file.name) / (1024 * 1024)
-                reduction = ((original_size - compressed_size) / original_size) * 100
-                
-                logger.info(f"Compressed file size: {compressed_size:.2f} MB")
-                logger.info(f"Size reduction: {reduction:.1f}%")
-                logger.info(f"Transformation completed in {time.time() - start_time:.1f} seconds")
-                
-                # If chunking is requested, check length and chunk if needed
-                if chunk_minutes:
-                    audio_length = get_audio_length(tmp_file.name)
-                    if audio_length <= chunk_minutes:
-                        logger.info(f"Audio length ({audio_length:.1f}m) <= chunk size ({chunk_minutes}m), skipping chunking")
-                        return (tmp_file.name, [])
-                    else:
-                        logger.info(f"Proceeding to chunk audio into {chunk_minutes}-minute segments")
-                        chunk_paths = chunk_audio(tmp_file.name, chunk_minutes)
-                        return (tmp_file.name, chunk_paths)
-                    
-                return tmp_file.name
+            # Log results
+            compressed_size = os.path.getsize(output_path) / (1024 * 1024)
+            reduction = ((original_size - compressed_size) / original_size) * 100
+            
+            logger.info("Compressed file size: %.2f MB", compressed_size)
+            logger.info("Size reduction: %.1f%%", reduction)
+            logger.info("Transformation completed in %.1f seconds", time.time() - start_time)
+            
+            # If chunking is requested, check length and chunk if needed
+            if chunk_minutes:
+                audio_length = get_audio_length(output_path)
+                if audio_length <= chunk_minutes:
+                    logger.info("Audio length (%.1fm) <= chunk size (%sm), skipping chunking", audio_length, chunk_minutes)
+                    return (output_path, [])
+                else:
+                    logger.info("Proceeding to chunk audio into %s-minute segments", chunk_minutes)
+                    chunk_paths = chunk_audio(output_path, chunk_minutes)
+                    return (output_path, chunk_paths)
                 
+            return output_path
+            
         except Exception as e:
             raise AudioTransformationError(f"Failed to export compressed audio: {str(e)}")
         
     except AudioTransformationError:
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in transform_audio: {str(e)}", exc_info=True)
-        raise AudioTransformationError(f"Unexpected error: {str(e)}") from None 
\ No newline at end of file
+        logger.error("Unexpected error in transform_audio: %s", e)
+        raise AudioTransformationError(f"Unexpected error: {str(e)}") from e 
\ No newline at end of file
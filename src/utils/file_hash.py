@@ -0,0 +1,30 @@
+import hashlib
+import mmap
+import os
+
+# Files at least this large are hashed through mmap, smaller ones with file_digest
+MMAP_HASH_THRESHOLD = 1 << 20
+
+def sha256_file(file_path: str) -> str:
+    """Calculate SHA-256 hash of a file's contents without reading it into memory.
+    
+    Args:
+        file_path: Path to the file
+        
+    Returns:
+        Hex digest of the file's contents
+    """
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size >= MMAP_HASH_THRESHOLD:
+            try:
+                # Let the kernel page the file straight into the hash, no Python buffers
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if hasattr(mmap, "MADV_SEQUENTIAL"):
+                        # Ask for aggressive readahead; an upload then reads from page cache
+                        mm.madvise(mmap.MADV_SEQUENTIAL)
+                    return hashlib.sha256(mm).hexdigest()
+            except (ValueError, OSError):
+                # File shrank to zero or the platform refused the mapping; read instead
+                f.seek(0)
+        # Reads into one reused buffer instead of allocating a bytes object per chunk
+        return hashlib.file_digest(f, "sha256").hexdigest()
@@ -0,0 +1,56 @@
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = ".lettercast_cache"
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+
+class ResponseCache:
+    """Exact-match cache of model responses stored as files on disk.
+
+    Entries are keyed by a SHA-256 of everything that determines the response
+    (model, generation config, prompt and audio hash) and expire after ttl seconds.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, ttl: float = DEFAULT_TTL_SECONDS):
+        self.directory = directory
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Build a cache key from the parts of a request"""
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        # Fan out by prefix so no single directory grows too large
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None if missing or expired"""
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.unlink(path)
+                return None
+            with open(path, "rb") as f:
+                return f.read().decode("utf-8")
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        """Store a response, replacing the entry atomically so readers never see partial writes"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(value.encode("utf-8"))
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
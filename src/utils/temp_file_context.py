@@ -1,8 +1,9 @@
+import asyncio
 import copy
 import os
 import logging
 
-from contextlib import contextmanager
+from contextlib import asynccontextmanager, contextmanager
 
 from utils.downloader import download_audio, DEFAULT_CONSTRAINTS
 from utils.audio_transformer import transform_audio, get_audio_length
@@ -10,7 +11,7 @@ from utils.audio_transformer import transform_audio, get_audio_length
 logger = logging.getLogger(__name__)
 
 @contextmanager
-def download_audio_context(url, chunk_size=8192):
+def download_audio_context(url, chunk_size=DEFAULT_CONSTRAINTS['chunk_size']):
     """Download audio file and clean up after use.
     
     Args:
@@ -57,7 +58,7 @@ def transform_audio_context(audio_path, chunk_minutes: int = None):
             
             if audio_length <= chunk_minutes:
                 # Episode too short to chunk
-                logger.info(f"Episode length ({audio_length:.1f}m) <= chunk size ({chunk_minutes}m), skipping chunking")
+                logger.info("Episode length (%.1fm) <= chunk size (%sm), skipping chunking", audio_length, chunk_minutes)
                 yield (full_audio_path, [])
             else:
                 # Create chunks from the transformed audio
@@ -81,4 +82,24 @@ def transform_audio_context(audio_path, chunk_minutes: int = None):
             for path in chunk_paths:
                 if path and os.path.exists(path):
                     os.unlink(path)
-        raise 
\ No newline at end of file
+        raise
+
+@asynccontextmanager
+async def async_download_audio_context(url, chunk_size=DEFAULT_CONSTRAINTS['chunk_size']):
+    """Async variant of download_audio_context that downloads in a worker thread.
+    
+    Args:
+        url: Audio file URL
+        chunk_size: Download chunk size in bytes
+        
+    Yields:
+        Path to downloaded file
+    """
+    constraints = copy.deepcopy(DEFAULT_CONSTRAINTS)
+    constraints['chunk_size'] = chunk_size
+    file_path = await asyncio.to_thread(download_audio, url, constraints=constraints)
+    try:
+        yield file_path
+    finally:
+        if file_path and os.path.exists(file_path):
+            os.unlink(file_path)
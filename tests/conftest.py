@@ -1,4 +1,5 @@
 import os
+import sys
 import pytest
 import pytest_asyncio
 import shutil
@@ -11,6 +12,22 @@ from sqlmodel.ext.asyncio.session import AsyncSession
 def mock_api_key():
     return "mock_api_key_for_testing"
 
+# Reset process-wide Gemini caches so each test sees its own mocks
+@pytest.fixture(autouse=True)
+def reset_analyzer_caches():
+    analyzer = sys.modules.get('src.core.analyzer')
+    if analyzer is not None:
+        analyzer._MODEL_CACHE.clear()
+        analyzer._configured_api_key = None
+    yield
+
+# Keep cached audio transformations from leaking between tests
+@pytest.fixture(autouse=True)
+def isolate_audio_cache(tmp_path, monkeypatch):
+    audio_transformer = sys.modules.get('src.utils.audio_transformer')
+    if audio_transformer is not None:
+        monkeypatch.setattr(audio_transformer, 'AUDIO_CACHE_DIR', str(tmp_path / "audio-cache"))
+
 # Async database fixtures
 @pytest_asyncio.fixture
 async def test_engine():
@@ -1,9 +1,18 @@
+import hashlib
+import os
 import pytest
-from datetime import datetime
+import re
+from datetime import datetime, timedelta
 import pytz
 from unittest.mock import patch, MagicMock, AsyncMock
+from google.api_core.exceptions import (
+    AlreadyExists, NotFound, PermissionDenied, ResourceExhausted, ServiceUnavailable
+)
+from google.generativeai.protos import Candidate
 
-from src.core.analyzer import PodcastAnalyzer, AnalyzerError
+from src.core.analyzer import PodcastAnalyzer, AnalyzerError, _hash_file
+from src.core.prompts import BACKGROUND, PREANALYSIS_STATIC_PREFIX, WRITING_AUDIO_ATTACHED, WRITING_NO_AUDIO
+from src.utils.response_cache import ResponseCache
 
 @patch('google.generativeai.configure')
 @patch('google.generativeai.GenerativeModel')
@@ -16,11 +25,18 @@ def test_analyzer_initialization(mock_model, mock_configure, mock_api_key):
     # Test valid initialization
     analyzer = PodcastAnalyzer(mock_api_key)
     assert analyzer is not None
-    assert analyzer.model is not None
+    # Models are only created when first used
+    mock_model.assert_not_called()
+    assert analyzer.preanalysis_model is not None
+    assert analyzer.writing_model is not None
     
     # Verify API was configured
     mock_configure.assert_called_once_with(api_key=mock_api_key)
     
+    # Later analyzers with the same key reuse the global configuration
+    PodcastAnalyzer(mock_api_key)
+    mock_configure.assert_called_once()
+    
     # Test initialization with invalid API key
     with pytest.raises(ValueError):
         PodcastAnalyzer("")
@@ -71,15 +87,18 @@ def test_validate_analysis(mock_model, mock_configure, mock_api_key):
     with patch('logging.Logger.warning') as mock_warning:
         analyzer.validate_analysis(invalid_analysis)
         mock_warning.assert_called_once()
-        warning_msg = mock_warning.call_args[0][0]
+        warning_msg = mock_warning.call_args[0][0] % mock_warning.call_args[0][1:]
         assert "missing required sections" in warning_msg.lower()
         assert "The big picture" in warning_msg
         assert "Quoted" in warning_msg
         assert "Worth your time if" in warning_msg
 
+@patch('google.generativeai.upload_file')
+@patch('google.generativeai.get_file')
 @patch('google.generativeai.configure')
 @patch('google.generativeai.GenerativeModel')
-def test_process_podcast(mock_model, mock_configure, mock_api_key, mock_audio_file):
+async def test_process_podcast(mock_model, mock_configure, mock_get_file, mock_upload_file,
+                               mock_api_key, mock_audio_file):
     """Test podcast processing with mock audio file"""
     # Mock the model's generate_content method
     mock_response = MagicMock()
@@ -102,12 +121,14 @@ def test_process_podcast(mock_model, mock_configure, mock_api_key, mock_audio_fi
     mock_instance = MagicMock()
     mock_instance.generate_content.return_value = mock_response
     mock_model.return_value = mock_instance
+    mock_get_file.side_effect = NotFound("missing")
+    mock_upload_file.return_value = MagicMock()
     
     analyzer = PodcastAnalyzer(mock_api_key)
     
     # Test with missing required parameters
     with pytest.raises(AnalyzerError):
-        analyzer.process_podcast(
+        await analyzer.process_podcast(
             audio_path="",
             name="Test Podcast",
             title="Test Episode",
@@ -117,7 +138,7 @@ def test_process_podcast(mock_model, mock_configure, mock_api_key, mock_audio_fi
     
     # Test with non-existent audio file
     with pytest.raises(AnalyzerError):
-        analyzer.process_podcast(
+        await analyzer.process_podcast(
             audio_path="/nonexistent/path.mp3",
             name="Test Podcast",
             title="Test Episode",
@@ -126,7 +147,7 @@ def test_process_podcast(mock_model, mock_configure, mock_api_key, mock_audio_fi
         )
     
     # Test with valid parameters and mock audio file
-    result = analyzer.process_podcast(
+    result = await analyzer.process_podcast(
         audio_path=mock_audio_file,
         name="Test Podcast",
         title="Test Episode",
@@ -143,5 +164,847 @@ def test_process_podcast(mock_model, mock_configure, mock_api_key, mock_audio_fi
     assert "Highlights" in result
     assert "Quoted" in result
     assert "Worth your time if" in result
-    assert "Test Podcast" in result
-    assert "Test Episode" in result 
\ No newline at end of file
+    
+    # One pre-analysis call and one writing call
+    assert mock_instance.generate_content.call_count == 2
+
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+async def test_analyze_audio_batch(mock_model, mock_configure, mock_api_key):
+    """Test batch processing returns results in order and isolates failures"""
+    mock_model.return_value = MagicMock()
+    analyzer = PodcastAnalyzer(mock_api_key)
+    
+    async def fake_process_podcast(**kwargs):
+        if kwargs['name'] == 'Broken':
+            raise AnalyzerError("boom")
+        return f"Newsletter for {kwargs['name']}"
+    
+    with patch.object(analyzer, 'process_podcast', side_effect=fake_process_podcast):
+        results = await analyzer.analyze_audio_batch(
+            [{'name': 'First'}, {'name': 'Broken'}, {'name': 'Third'}],
+            max_concurrency=2
+        )
+    
+    assert results[0] == "Newsletter for First"
+    assert isinstance(results[1], AnalyzerError)
+    assert results[2] == "Newsletter for Third"
+
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+def test_get_stage_semaphores(mock_model, mock_configure, mock_api_key, tmp_path):
+    """Test episodes share stage limits only with episodes of a similar size"""
+    mock_model.return_value = MagicMock()
+    analyzer = PodcastAnalyzer(mock_api_key)
+    stage_semaphores = analyzer.create_stage_semaphores(2)
+    
+    short_path = tmp_path / "short.mp3"
+    short_path.write_bytes(b"a" * 1024)
+    other_short_path = tmp_path / "other_short.mp3"
+    other_short_path.write_bytes(b"b" * 2048)
+    analyzer.file_sizes[str(tmp_path / "long.mp3")] = 100 * 1024 * 1024
+    
+    short = analyzer.get_stage_semaphores(stage_semaphores, str(short_path))
+    long = analyzer.get_stage_semaphores(stage_semaphores, str(tmp_path / "long.mp3"))
+    
+    assert set(short) == {'preanalysis_semaphore', 'writing_semaphore'}
+    assert short['preanalysis_semaphore'] is not short['writing_semaphore']
+    assert analyzer.get_stage_semaphores(stage_semaphores, str(other_short_path)) is short
+    assert long['preanalysis_semaphore'] is not short['preanalysis_semaphore']
+
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+async def test_get_file_hash(mock_model, mock_configure, mock_api_key, tmp_path):
+    """Test file hashing matches a direct SHA-256 of the contents"""
+    mock_model.return_value = MagicMock()
+    analyzer = PodcastAnalyzer(mock_api_key)
+    
+    # Larger than one read chunk so streaming is exercised
+    data = os.urandom(3 * (1 << 20) + 123)
+    audio_path = tmp_path / "audio.mp3"
+    audio_path.write_bytes(data)
+    
+    expected = hashlib.sha256(data).hexdigest()
+    assert analyzer._get_file_hash(str(audio_path)) == expected
+    assert await analyzer._get_file_hash_async(str(audio_path)) == expected
+    
+    # Relative and absolute paths to the same file share one cache entry
+    _hash_file.cache_clear()
+    analyzer._get_file_hash(str(audio_path))
+    analyzer._get_file_hash(os.path.relpath(audio_path))
+    assert _hash_file.cache_info().misses == 1
+    
+    # Cached hashes are invalidated when the file changes
+    audio_path.write_bytes(b"new contents")
+    assert analyzer._get_file_hash(str(audio_path)) == hashlib.sha256(b"new contents").hexdigest()
+    
+    # A file swapped in with the same size and mtime is still rehashed
+    stat = os.stat(audio_path)
+    replacement_path = tmp_path / "replacement.mp3"
+    replacement_path.write_bytes(b"old contents")
+    os.utime(replacement_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(replacement_path, audio_path)
+    assert analyzer._get_file_hash(str(audio_path)) == hashlib.sha256(b"old contents").hexdigest()
+
+@patch('google.generativeai.upload_file')
+@patch('google.generativeai.get_file')
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+async def test_remote_file_lookup(mock_model, mock_configure, mock_get_file, mock_upload_file,
+                                  mock_api_key, tmp_path):
+    """Test stored audio is found by its hash-derived name and uploads are reused"""
+    mock_response = MagicMock()
+    mock_response.text = "Insights"
+    mock_instance = MagicMock()
+    mock_instance.generate_content.return_value = mock_response
+    mock_model.return_value = mock_instance
+    
+    audio_path = tmp_path / "audio.mp3"
+    audio_path.write_bytes(b"audio data")
+    other_path = tmp_path / "other.mp3"
+    other_path.write_bytes(b"other audio data")
+    
+    existing_name = f"files/sha256-{hashlib.sha256(b'audio data').hexdigest()[:33]}"
+    other_name = f"files/sha256-{hashlib.sha256(b'other audio data').hexdigest()[:33]}"
+    existing_file = MagicMock()
+    
+    def get_file(name):
+        if name == existing_name:
+            return existing_file
+        raise NotFound("missing")
+    
+    mock_get_file.side_effect = get_file
+    mock_upload_file.return_value = MagicMock()
+    
+    analyzer = PodcastAnalyzer(mock_api_key)
+    await analyzer.analyze_audio(str(audio_path), "Test Podcast", "")
+    await analyzer.analyze_audio(str(other_path), "Test Podcast", "")
+    await analyzer.analyze_audio(str(other_path), "Test Podcast", "")
+    
+    assert len(existing_name) - len("files/") == 40
+    assert mock_get_file.call_count == 2
+    mock_upload_file.assert_called_once_with(str(other_path), name=other_name)
+    assert mock_instance.generate_content.call_args_list[0][0][0][-1] is existing_file
+    
+    # An upload that loses a race to another uploader picks up the stored file
+    race_path = tmp_path / "race.mp3"
+    race_path.write_bytes(b"raced audio")
+    raced_file = MagicMock()
+    mock_get_file.side_effect = [PermissionDenied("missing"), raced_file]
+    mock_upload_file.side_effect = AlreadyExists("exists")
+    assert await analyzer._get_or_upload_file(str(race_path)) is raced_file
+    
+    # Cached files about to expire on Gemini's side are looked up again
+    raced_file.expiration_time = datetime.now(pytz.UTC) + timedelta(minutes=5)
+    refreshed_file = MagicMock()
+    mock_get_file.side_effect = None
+    mock_get_file.return_value = refreshed_file
+    assert await analyzer._get_or_upload_file(str(race_path)) is refreshed_file
+
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+def test_get_size_bin(mock_model, mock_configure, mock_api_key, tmp_path):
+    """Test batch episodes are binned by audio file size"""
+    mock_model.return_value = MagicMock()
+    analyzer = PodcastAnalyzer(mock_api_key)
+    
+    small_path = tmp_path / "small.mp3"
+    small_path.write_bytes(b"0" * 1024)
+    assert analyzer._get_size_bin(str(small_path)) == 0
+    
+    analyzer.file_sizes["medium.mp3"] = 50 * 1024 * 1024
+    analyzer.file_sizes["large.mp3"] = 200 * 1024 * 1024
+    assert analyzer._get_size_bin("medium.mp3") == 1
+    assert analyzer._get_size_bin("large.mp3") == 2
+    
+    # Missing files fall into the first bin and fail later in validation
+    assert analyzer._get_size_bin("/nonexistent/path.mp3") == 0
+    assert analyzer._get_size_bin(None) == 0
+
+@patch('google.generativeai.upload_file')
+@patch('google.generativeai.get_file')
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+async def test_process_podcast_uploads_once(mock_model, mock_configure, mock_get_file,
+                                            mock_upload_file, mock_api_key, tmp_path):
+    """Test the writing pass reuses the audio uploaded for pre-analysis"""
+    mock_response = MagicMock()
+    mock_response.text = "# TLDR\n# The big picture\n# Highlights\n# Quoted\n# Worth your time if"
+    mock_instance = MagicMock()
+    mock_instance.generate_content.return_value = mock_response
+    mock_model.return_value = mock_instance
+    mock_get_file.side_effect = NotFound("missing")
+    uploaded_file = MagicMock()
+    mock_upload_file.return_value = uploaded_file
+    
+    audio_path = tmp_path / "episode.mp3"
+    audio_path.write_bytes(b"episode audio")
+    
+    analyzer = PodcastAnalyzer(mock_api_key)
+    with patch.object(analyzer, '_get_or_upload_file', wraps=analyzer._get_or_upload_file) as lookup:
+        await analyzer.process_podcast(
+            audio_path=str(audio_path),
+            name="Test Podcast",
+            title="Test Episode",
+            category="interview",
+            publish_date=datetime.now(pytz.UTC),
+            prompt_addition="Test context",
+            episode_description="Test description"
+        )
+    
+    # The writing pass finds the upload in memory instead of asking Gemini again
+    assert lookup.call_count == 2
+    mock_get_file.assert_called_once()
+    mock_upload_file.assert_called_once()
+    for call in mock_instance.generate_content.call_args_list:
+        assert call[0][0][-1] is uploaded_file
+
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+def test_save_newsletter(mock_model, mock_configure, mock_api_key, tmp_path):
+    """Test newsletter is written atomically as UTF-8, creating missing directories"""
+    mock_model.return_value = MagicMock()
+    analyzer = PodcastAnalyzer(mock_api_key)
+    output_path = tmp_path / "newsletters" / "test.md"
+    newsletter = "# Lettercast\n\nCafé — “quoted” text"
+    
+    result = analyzer.save_newsletter(newsletter, str(output_path))
+    
+    assert result == str(output_path)
+    assert output_path.read_bytes() == newsletter.encode('utf-8')
+    assert list(output_path.parent.iterdir()) == [output_path]
+    
+    # A failed write leaves the previous newsletter in place and no temporary file
+    with patch('os.write', side_effect=OSError("disk full")):
+        with pytest.raises(AnalyzerError):
+            analyzer.save_newsletter("# Partial", str(output_path))
+    assert output_path.read_bytes() == newsletter.encode('utf-8')
+    assert list(output_path.parent.iterdir()) == [output_path]
+
+@patch('asyncio.sleep', new_callable=AsyncMock)
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+async def test_generate_content_retries(mock_model, mock_configure, mock_sleep, mock_api_key):
+    """Test rate-limited Gemini calls are retried with backoff"""
+    mock_response = MagicMock()
+    mock_instance = MagicMock()
+    mock_instance.generate_content.side_effect = [
+        ResourceExhausted("quota"), ServiceUnavailable("busy"), mock_response
+    ]
+    mock_model.return_value = mock_instance
+    analyzer = PodcastAnalyzer(mock_api_key)
+    
+    assert await analyzer._generate_content(mock_instance, ["prompt"]) is mock_response
+    assert mock_instance.generate_content.call_count == 3
+    assert mock_sleep.await_count == 2
+    
+    # The last failure is raised once retries run out
+    mock_instance.generate_content.side_effect = ResourceExhausted("quota")
+    with pytest.raises(ResourceExhausted):
+        await analyzer._generate_content(mock_instance, ["prompt"])
+    assert mock_instance.generate_content.call_count == 3 + analyzer.MAX_RETRIES
+
+@patch('google.generativeai.upload_file')
+@patch('google.generativeai.get_file')
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+async def test_process_podcast_reuses_chunk_uploads(mock_model, mock_configure, mock_get_file,
+                                                    mock_upload_file, mock_api_key, tmp_path):
+    """Test chunked episodes never upload the full audio, and attach chunk audio only when asked"""
+    mock_response = MagicMock()
+    mock_response.text = "# TLDR\n# The big picture\n# Highlights\n# Quoted\n# Worth your time if"
+    mock_instance = MagicMock()
+    mock_instance.generate_content.return_value = mock_response
+    mock_model.return_value = mock_instance
+    mock_get_file.side_effect = NotFound("missing")
+    uploads = {}
+    mock_upload_file.side_effect = lambda path, name: uploads.setdefault(path, MagicMock())
+    
+    audio_path = tmp_path / "episode.mp3"
+    audio_path.write_bytes(b"episode audio")
+    chunk_paths = []
+    for i in range(2):
+        chunk_path = tmp_path / f"chunk_{i}.mp3"
+        chunk_path.write_bytes(f"chunk {i}".encode())
+        chunk_paths.append(str(chunk_path))
+    
+    analyzer = PodcastAnalyzer(mock_api_key)
+    await analyzer.process_podcast(
+        audio_path=str(audio_path),
+        name="Test Podcast",
+        title="Test Episode",
+        category="interview",
+        publish_date=datetime.now(pytz.UTC),
+        chunk_paths=chunk_paths
+    )
+    
+    assert sorted(uploads) == chunk_paths
+    writing_parts = mock_instance.generate_content.call_args_list[-1][0][0]
+    assert len(writing_parts) == 1
+    # The model is told it has no audio to check against
+    assert WRITING_NO_AUDIO in writing_parts[0]
+    
+    analyzer = PodcastAnalyzer(mock_api_key, include_full_audio_in_final=True)
+    await analyzer.process_podcast(
+        audio_path=str(audio_path),
+        name="Test Podcast",
+        title="Test Episode",
+        category="interview",
+        publish_date=datetime.now(pytz.UTC),
+        chunk_paths=chunk_paths
+    )
+    
+    assert sorted(uploads) == chunk_paths
+    writing_parts = mock_instance.generate_content.call_args_list[-1][0][0]
+    assert writing_parts[1:] == [uploads[path] for path in chunk_paths]
+    assert WRITING_AUDIO_ATTACHED in writing_parts[0]
+
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+def test_concurrency_limits(mock_model, mock_configure, mock_api_key, monkeypatch):
+    """Test upload and generation limits come from the constructor, then the environment"""
+    mock_model.return_value = MagicMock()
+    
+    analyzer = PodcastAnalyzer(mock_api_key, max_concurrent_uploads=2, max_concurrent_generations=3)
+    assert analyzer.max_concurrent_uploads == 2
+    assert analyzer.max_concurrent_generations == 3
+    
+    monkeypatch.setenv("LETTERCAST_MAX_CONCURRENCY", "7")
+    analyzer = PodcastAnalyzer(mock_api_key)
+    assert analyzer.max_concurrent_uploads == PodcastAnalyzer.MAX_CONCURRENT_UPLOADS
+    assert analyzer.max_concurrent_generations == 7
+
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+def test_select_preanalysis_model(mock_model, mock_configure, mock_api_key):
+    """Test only chunked interviews are pre-analyzed with the thinking model"""
+    mock_model.side_effect = lambda model_name, generation_config, **kwargs: MagicMock(model_name=model_name)
+    analyzer = PodcastAnalyzer(mock_api_key)
+    
+    assert analyzer._select_preanalysis_model('interview', chunked=True) is analyzer.preanalysis_model
+    assert analyzer._select_preanalysis_model('interview', chunked=False) is analyzer.fast_model
+    assert analyzer._select_preanalysis_model('banter', chunked=True) is analyzer.fast_model
+    assert analyzer.fast_model is not analyzer.preanalysis_model
+    
+    # Only the writing model carries the system prompt
+    analyzer.writing_model
+    system_instructions = {
+        call.kwargs['model_name']: call.kwargs.get('system_instruction')
+        for call in mock_model.call_args_list
+    }
+    assert system_instructions[analyzer.preanalysis_model.model_name] is None
+    assert system_instructions[analyzer.fast_model.model_name] is None
+    assert BACKGROUND in system_instructions[analyzer.writing_model.model_name]
+    assert system_instructions[analyzer.writing_model.model_name] == analyzer._writing_system_prompt
+
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+async def test_analyze_audio_prompt_order(mock_model, mock_configure, mock_api_key, tmp_path):
+    """Test pre-analysis requests start with the same static prefix for every episode"""
+    mock_response = MagicMock()
+    mock_response.text = "Insights"
+    mock_instance = MagicMock()
+    mock_instance.generate_content.return_value = mock_response
+    mock_model.return_value = mock_instance
+    analyzer = PodcastAnalyzer(mock_api_key)
+    audio_file = MagicMock()
+    
+    await analyzer.analyze_audio("a.mp3", "First Podcast", "", audio_file=audio_file)
+    await analyzer.analyze_audio("b.mp3", "Second Podcast", "", chunk_context="Part 1 of 2",
+                                 moment_count=7, audio_file=audio_file)
+    
+    first, second = (call[0][0] for call in mock_instance.generate_content.call_args_list)
+    assert first[0] == second[0]
+    assert "{" not in first[0]
+    assert "First Podcast" in first[1] and "Second Podcast" in second[1]
+    assert "Concrete moments: 7" in second[2] and "Part 1 of 2" in second[2]
+    assert first[-1] is audio_file
+    
+    # Output is capped to a budget sized by the requested counts
+    full_budget = mock_instance.generate_content.call_args_list[0][1]['generation_config']['max_output_tokens']
+    chunk_budget = mock_instance.generate_content.call_args_list[1][1]['generation_config']['max_output_tokens']
+    assert full_budget == analyzer._preanalysis_token_budget(10, 15, 6)
+    assert chunk_budget < full_budget <= 8192
+
+@patch('google.generativeai.upload_file')
+@patch('google.generativeai.get_file')
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+async def test_thinking_model_budget(mock_model, mock_configure, mock_get_file,
+                                     mock_upload_file, mock_api_key, tmp_path):
+    """Test a thinking model's budget leaves room for its reasoning before the answer"""
+    insights = "<INSIGHTS Part 1 of 1>" + "x" * 4 * 3000 + "</INSIGHTS Part 1 of 1>"
+    
+    def think_then_answer(contents, generation_config, **kwargs):
+        # Reasoning comes out of the same output budget, ahead of the answer
+        answer_tokens = generation_config['max_output_tokens'] - 3000
+        response = MagicMock()
+        response.text = insights[:max(answer_tokens, 0) * 4]
+        return response
+    
+    newsletter_response = MagicMock()
+    newsletter_response.text = "# TLDR\n# The big picture\n# Highlights\n# Quoted\n# Worth your time if"
+    models = {
+        "gemini-2.0-flash-thinking-exp": MagicMock(model_name="gemini-2.0-flash-thinking-exp"),
+        "gemini-2.0-flash-lite": MagicMock(model_name="gemini-2.0-flash-lite"),
+        "gemini-2.0-flash-exp": MagicMock(model_name="gemini-2.0-flash-exp"),
+    }
+    models["gemini-2.0-flash-thinking-exp"].generate_content.side_effect = think_then_answer
+    models["gemini-2.0-flash-exp"].generate_content.return_value = newsletter_response
+    mock_model.side_effect = lambda model_name, **kwargs: models[model_name]
+    mock_get_file.side_effect = NotFound("missing")
+    
+    audio_path = tmp_path / "episode.mp3"
+    audio_path.write_bytes(b"episode audio")
+    chunk_path = tmp_path / "chunk_0.mp3"
+    chunk_path.write_bytes(b"chunk audio")
+    
+    analyzer = PodcastAnalyzer(mock_api_key)
+    assert analyzer._preanalysis_token_budget(7, 8, 3, thinking=True) == (
+        analyzer._preanalysis_token_budget(7, 8, 3) + analyzer.PREANALYSIS_THINKING_TOKENS
+    )
+    
+    with patch('logging.Logger.warning') as mock_warning:
+        newsletter = await analyzer.process_podcast(
+            audio_path=str(audio_path),
+            name="Test Podcast",
+            title="Test Episode",
+            category="interview",
+            publish_date=datetime.now(pytz.UTC),
+            chunk_paths=[str(chunk_path)]
+        )
+        analyzer.validate_analysis(newsletter)
+    
+    # The capped pre-analysis still reached its closing tag, and the newsletter is complete
+    writing_prompt = models["gemini-2.0-flash-exp"].generate_content.call_args[0][0][0]
+    assert insights in writing_prompt
+    assert not any("missing required sections" in str(call) for call in mock_warning.call_args_list)
+
+def test_preanalysis_prefix_length():
+    """Test the static pre-analysis prefix stays within its token budget"""
+    prefix = PREANALYSIS_STATIC_PREFIX.format(background=BACKGROUND)
+    
+    # Roughly four characters per token for English prose
+    assert len(prefix) / 4 <= 1024
+    assert "{" not in prefix and "}" not in prefix
+    
+    # Condensing the rubric must not drop the quote-rating filter
+    assert "scoring 4 or more in all five" in prefix
+
+@patch('google.generativeai.upload_file')
+@patch('google.generativeai.get_file')
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+async def test_process_podcast_writing_system_instruction(mock_model, mock_configure, mock_get_file,
+                                                          mock_upload_file, mock_api_key, tmp_path):
+    """Test the newsletter rubric is sent as the writing model's system instruction"""
+    mock_response = MagicMock()
+    mock_response.text = "# TLDR\n# The big picture\n# Highlights\n# Quoted\n# Worth your time if"
+    mock_instance = MagicMock()
+    mock_instance.generate_content.return_value = mock_response
+    mock_model.return_value = mock_instance
+    mock_get_file.side_effect = NotFound("missing")
+    
+    audio_path = tmp_path / "episode.mp3"
+    audio_path.write_bytes(b"episode audio")
+    chunk_paths = []
+    for i in range(2):
+        chunk_path = tmp_path / f"chunk_{i}.mp3"
+        chunk_path.write_bytes(f"chunk {i}".encode())
+        chunk_paths.append(str(chunk_path))
+    
+    analyzer = PodcastAnalyzer(mock_api_key)
+    await analyzer.process_podcast(
+        audio_path=str(audio_path),
+        name="Test Podcast",
+        title="Test Episode",
+        category="interview",
+        publish_date=datetime.now(pytz.UTC),
+        chunk_paths=chunk_paths,
+        prompt_addition="Custom instructions"
+    )
+    
+    writing_kwargs = next(
+        call[1] for call in mock_model.call_args_list
+        if call[1]['model_name'] == "gemini-2.0-flash-exp"
+    )
+    system_instruction = writing_kwargs['system_instruction']
+    assert "# Newsletter Format" in system_instruction
+    assert "Today's date" in system_instruction
+    
+    # The request itself only carries the episode materials
+    prompt = mock_instance.generate_content.call_args_list[-1][0][0][0]
+    assert "Custom instructions" in prompt and mock_response.text in prompt
+    assert "# Newsletter Format" not in prompt
+
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+async def test_analyze_chunks_batched(mock_model, mock_configure, mock_api_key):
+    """Test chunks are analyzed in one request, falling back to per-chunk calls when incomplete"""
+    batched_response = MagicMock()
+    batched_response.text = (
+        "<<<CHUNK 1>>>\n<INSIGHTS Part 1 of 2>first</INSIGHTS Part 1 of 2>\n"
+        "<<<CHUNK 2>>>\n<INSIGHTS Part 2 of 2>second</INSIGHTS Part 2 of 2>\n"
+    )
+    mock_instance = MagicMock()
+    mock_instance.generate_content.return_value = batched_response
+    mock_model.return_value = mock_instance
+    analyzer = PodcastAnalyzer(mock_api_key, batch_chunk_analysis=True)
+    audio_files = [MagicMock(), MagicMock()]
+    
+    analyses = await analyzer.analyze_chunks(["a.mp3", "b.mp3"], "Test Podcast", "", audio_files=audio_files)
+    
+    assert analyses == [
+        "<INSIGHTS Part 1 of 2>first</INSIGHTS Part 1 of 2>",
+        "<INSIGHTS Part 2 of 2>second</INSIGHTS Part 2 of 2>"
+    ]
+    mock_instance.generate_content.assert_called_once()
+    assert mock_instance.generate_content.call_args[0][0][-2:] == audio_files
+    
+    # A truncated response falls back to one request per chunk
+    truncated_response = MagicMock()
+    truncated_response.text = "<<<CHUNK 1>>>\n<INSIGHTS Part 1 of 2>first</INSIGHTS Part 1 of 2>\n<<<CHUNK 2>>>\n<INSIGHTS"
+    chunk_response = MagicMock()
+    chunk_response.text = "chunk insights"
+    mock_instance.generate_content.reset_mock()
+    mock_instance.generate_content.side_effect = [truncated_response, chunk_response, chunk_response]
+    
+    analyses = await analyzer.analyze_chunks(["a.mp3", "b.mp3"], "Test Podcast", "", audio_files=audio_files)
+    
+    assert analyses == ["chunk insights", "chunk insights"]
+    assert mock_instance.generate_content.call_count == 3
+    
+    # Per-chunk requests share the episode details and differ only in the chunk details
+    first, second = (call[0][0] for call in mock_instance.generate_content.call_args_list[1:])
+    assert first[1] is second[1]
+    assert first[2] != second[2]
+
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+async def test_analyze_chunks_batched_groups(mock_model, mock_configure, mock_api_key, tmp_path):
+    """Test batched analysis splits chunks into groups that fit the output limit, and caches them"""
+    def batched_response(contents, generation_config, **kwargs):
+        # Answer for exactly the parts named in the batch details
+        first, last = (int(n) for n in re.search(r"parts (\d+) to (\d+)", contents[2]).groups())
+        response = MagicMock()
+        response.text = "".join(
+            f"<<<CHUNK {n}>>>\n<INSIGHTS Part {n} of 5>part {n}</INSIGHTS Part {n} of 5>\n"
+            for n in range(first, last + 1)
+        )
+        return response
+    
+    mock_instance = MagicMock()
+    mock_instance.model_name = "gemini-test"
+    mock_instance.generate_content.side_effect = batched_response
+    mock_model.return_value = mock_instance
+    analyzer = PodcastAnalyzer(mock_api_key, batch_chunk_analysis=True,
+                               response_cache=ResponseCache(str(tmp_path / "cache")))
+    chunk_paths = []
+    for i in range(5):
+        chunk_path = tmp_path / f"chunk_{i}.mp3"
+        chunk_path.write_bytes(f"chunk {i}".encode())
+        chunk_paths.append(str(chunk_path))
+    audio_files = [MagicMock() for _ in chunk_paths]
+    
+    analyses = await analyzer.analyze_chunks(chunk_paths, "Test Podcast", "", audio_files=audio_files)
+    
+    assert analyses == [f"<INSIGHTS Part {n} of 5>part {n}</INSIGHTS Part {n} of 5>" for n in range(1, 6)]
+    group_size = analyzer._batch_group_size(mock_instance)
+    assert mock_instance.generate_content.call_count == -(-5 // group_size)
+    for call in mock_instance.generate_content.call_args_list:
+        budget = call[1]['generation_config']['max_output_tokens']
+        assert budget <= analyzer.preanalysis_config['max_output_tokens']
+        assert len(call[0][0]) - 3 <= group_size
+    
+    # A repeated run is served from the cache
+    mock_instance.generate_content.reset_mock()
+    assert await analyzer.analyze_chunks(chunk_paths, "Test Podcast", "", audio_files=audio_files) == analyses
+    mock_instance.generate_content.assert_not_called()
+
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+def test_batch_group_size(mock_model, mock_configure, mock_api_key):
+    """Test batches fit at least two chunk analyses, including for the thinking model"""
+    mock_model.side_effect = lambda model_name, generation_config, **kwargs: MagicMock(model_name=model_name)
+    analyzer = PodcastAnalyzer(mock_api_key, batch_chunk_analysis=True)
+    chunk_budget = analyzer._preanalysis_token_budget(7, 8, 3)
+    
+    for model in (analyzer.preanalysis_model, analyzer.fast_model):
+        group_size = analyzer._batch_group_size(model)
+        assert group_size >= 2
+        
+        # A full group's budget, with any reasoning allowance, stays within the model's cap
+        reasoning = analyzer.PREANALYSIS_THINKING_TOKENS if analyzer._is_thinking_model(model) else 0
+        cap = analyzer._output_token_cap(model)
+        assert group_size * chunk_budget + reasoning <= cap
+
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+async def test_analyze_audio_truncated(mock_model, mock_configure, mock_api_key, tmp_path):
+    """Test a pre-analysis cut off by its token budget is retried with the full output cap"""
+    truncated = MagicMock(text="<INSIGHTS the full episode>cut off")
+    truncated.candidates[0].finish_reason = Candidate.FinishReason.MAX_TOKENS
+    complete = MagicMock(text="<INSIGHTS the full episode>done</INSIGHTS the full episode>")
+    complete.candidates[0].finish_reason = Candidate.FinishReason.STOP
+    mock_instance = MagicMock()
+    mock_instance.model_name = "gemini-test"
+    mock_instance.generate_content.side_effect = [truncated, complete, truncated, truncated]
+    mock_model.return_value = mock_instance
+    analyzer = PodcastAnalyzer(mock_api_key, response_cache=ResponseCache(str(tmp_path / "cache")))
+    audio_path = tmp_path / "episode.mp3"
+    audio_path.write_bytes(b"episode audio")
+    
+    result = await analyzer.analyze_audio(str(audio_path), "Test Podcast", "", audio_file=MagicMock())
+    
+    assert result == complete.text
+    first, retry = (call[1]['generation_config']['max_output_tokens']
+                    for call in mock_instance.generate_content.call_args_list)
+    assert first == analyzer._preanalysis_token_budget(10, 15, 6)
+    assert retry == analyzer._output_token_cap(mock_instance) > first
+    
+    # An analysis still truncated at the full cap is returned, but not cached
+    audio_path.write_bytes(b"other audio")
+    with patch('logging.Logger.warning') as mock_warning:
+        result = await analyzer.analyze_audio(str(audio_path), "Test Podcast", "", audio_file=MagicMock())
+    assert result == truncated.text
+    assert mock_warning.call_count == 2
+    cached_entries = [name for _, _, names in os.walk(tmp_path / "cache") for name in names]
+    assert len(cached_entries) == 1
+
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+async def test_analyze_audio_response_cache(mock_model, mock_configure, mock_api_key, tmp_path):
+    """Test repeated pre-analyses of the same audio and prompt are served from the cache"""
+    mock_response = MagicMock()
+    mock_response.text = "Insights"
+    mock_instance = MagicMock()
+    mock_instance.generate_content.return_value = mock_response
+    mock_instance.model_name = "gemini-test"
+    mock_model.return_value = mock_instance
+    analyzer = PodcastAnalyzer(mock_api_key, response_cache=ResponseCache(str(tmp_path / "cache")))
+    
+    audio_path = tmp_path / "audio.mp3"
+    audio_path.write_bytes(b"audio data")
+    audio_file = MagicMock()
+    
+    assert await analyzer.analyze_audio(str(audio_path), "Test Podcast", "", audio_file=audio_file) == "Insights"
+    assert await analyzer.analyze_audio(str(audio_path), "Test Podcast", "", audio_file=audio_file) == "Insights"
+    mock_instance.generate_content.assert_called_once()
+    
+    # A different prompt is a different request
+    await analyzer.analyze_audio(str(audio_path), "Other Podcast", "", audio_file=audio_file)
+    assert mock_instance.generate_content.call_count == 2
+
+@patch('google.generativeai.upload_file')
+@patch('google.generativeai.get_file')
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+async def test_process_podcast_response_cache(mock_model, mock_configure, mock_get_file,
+                                              mock_upload_file, mock_api_key, tmp_path):
+    """Test a repeated episode is served from the cache without uploads or model calls"""
+    mock_response = MagicMock()
+    mock_response.text = "# TLDR\n# The big picture\n# Highlights\n# Quoted\n# Worth your time if"
+    mock_instance = MagicMock()
+    mock_instance.generate_content.return_value = mock_response
+    mock_instance.model_name = "gemini-test"
+    mock_model.return_value = mock_instance
+    mock_get_file.side_effect = NotFound("missing")
+    
+    audio_path = tmp_path / "episode.mp3"
+    audio_path.write_bytes(b"episode audio")
+    episode = {
+        'audio_path': str(audio_path),
+        'name': "Test Podcast",
+        'title': "Test Episode",
+        'category': "interview",
+        'publish_date': datetime.now(pytz.UTC)
+    }
+    
+    cache = ResponseCache(str(tmp_path / "cache"))
+    first = await PodcastAnalyzer(mock_api_key, response_cache=cache).process_podcast(**episode)
+    second = await PodcastAnalyzer(mock_api_key, response_cache=cache).process_podcast(
+        **episode, output_path=str(tmp_path / "episode.md")
+    )
+    
+    assert first == second == mock_response.text
+    assert (tmp_path / "episode.md").read_text(encoding="utf-8") == mock_response.text
+    assert mock_instance.generate_content.call_count == 2
+    mock_upload_file.assert_called_once()
+    
+    # A cached chunked episode neither looks up nor uploads its chunks
+    chunk_paths = []
+    for i in range(2):
+        chunk_path = tmp_path / f"chunk_{i}.mp3"
+        chunk_path.write_bytes(f"chunk {i}".encode())
+        chunk_paths.append(str(chunk_path))
+    await PodcastAnalyzer(mock_api_key, response_cache=cache).process_podcast(**episode, chunk_paths=chunk_paths)
+    mock_get_file.reset_mock()
+    mock_upload_file.reset_mock()
+    mock_instance.generate_content.reset_mock()
+    
+    await PodcastAnalyzer(mock_api_key, response_cache=cache).process_podcast(**episode, chunk_paths=chunk_paths)
+    
+    mock_get_file.assert_not_called()
+    mock_upload_file.assert_not_called()
+    mock_instance.generate_content.assert_not_called()
+
+@patch('google.generativeai.upload_file')
+@patch('google.generativeai.get_file')
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+async def test_process_podcast_streams_to_file(mock_model, mock_configure, mock_get_file,
+                                               mock_upload_file, mock_api_key, tmp_path):
+    """Test the newsletter is streamed to output_path when one is given"""
+    newsletter = "# TLDR\n# The big picture\n# Highlights\n# Quoted\n# Worth your time if"
+    chunks = [MagicMock(parts=[MagicMock()], text=line + "\n") for line in newsletter.split("\n")]
+    chunks[-1].text = chunks[-1].text.rstrip("\n")
+    chunks.append(MagicMock(parts=[]))
+    
+    stream_response = MagicMock()
+    stream_response.__iter__.return_value = iter(chunks)
+    stream_response.text = newsletter
+    preanalysis_response = MagicMock()
+    preanalysis_response.text = "Insights"
+    mock_instance = MagicMock()
+    mock_instance.generate_content.side_effect = (
+        lambda contents, stream=False, **kwargs: stream_response if stream else preanalysis_response
+    )
+    mock_model.return_value = mock_instance
+    mock_get_file.side_effect = NotFound("missing")
+    
+    audio_path = tmp_path / "episode.mp3"
+    audio_path.write_bytes(b"episode audio")
+    output_path = tmp_path / "newsletters" / "episode.md"
+    
+    analyzer = PodcastAnalyzer(mock_api_key)
+    result = await analyzer.process_podcast(
+        audio_path=str(audio_path),
+        name="Test Podcast",
+        title="Test Episode",
+        category="interview",
+        publish_date=datetime.now(pytz.UTC),
+        output_path=str(output_path)
+    )
+    
+    assert result == newsletter
+    assert output_path.read_text(encoding="utf-8") == newsletter
+
+@patch('asyncio.sleep', new_callable=AsyncMock)
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+async def test_generate_to_file_holds_slot_and_retries(mock_model, mock_configure, mock_sleep,
+                                                       mock_api_key, tmp_path):
+    """Test a streamed generation holds its slot until consumed and restarts after mid-stream errors"""
+    analyzer = PodcastAnalyzer(mock_api_key, max_concurrent_generations=1)
+    slot_held = []
+    
+    def stream(fail):
+        yield MagicMock(parts=[MagicMock()], text="# TLDR\n")
+        slot_held.append(analyzer._semaphores['generation'][1].locked())
+        if fail:
+            raise ResourceExhausted("quota")
+        yield MagicMock(parts=[MagicMock()], text="# Quoted")
+    
+    responses = []
+    for fail in (True, False):
+        response = MagicMock()
+        response.__iter__.return_value = stream(fail)
+        response.text = "# TLDR\n# Quoted"
+        responses.append(response)
+    mock_instance = MagicMock()
+    mock_instance.generate_content.side_effect = responses
+    output_path = tmp_path / "newsletter.md"
+    
+    result = await analyzer._generate_to_file(mock_instance, ["prompt"], str(output_path))
+    
+    assert result == "# TLDR\n# Quoted"
+    # The retry rewrote the file instead of appending to the interrupted attempt
+    assert output_path.read_text(encoding="utf-8") == "# TLDR\n# Quoted"
+    assert slot_held == [True, True]
+    assert mock_sleep.await_count == 1
+
+@patch('google.generativeai.upload_file')
+@patch('google.generativeai.get_file')
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+async def test_process_podcast_requests_missing_sections(mock_model, mock_configure, mock_get_file,
+                                                         mock_upload_file, mock_api_key, tmp_path):
+    """Test a newsletter missing sections is continued with only those sections"""
+    preanalysis_response = MagicMock()
+    preanalysis_response.text = "Insights"
+    partial_response = MagicMock()
+    partial_response.text = "# TLDR\n# The big picture\n# Highlights"
+    continuation_response = MagicMock()
+    continuation_response.text = "# Quoted\n# Worth your time if"
+    mock_instance = MagicMock()
+    mock_instance.generate_content.side_effect = [preanalysis_response, partial_response, continuation_response]
+    mock_model.return_value = mock_instance
+    mock_get_file.side_effect = NotFound("missing")
+    
+    audio_path = tmp_path / "episode.mp3"
+    audio_path.write_bytes(b"episode audio")
+    
+    analyzer = PodcastAnalyzer(mock_api_key)
+    result = await analyzer.process_podcast(
+        audio_path=str(audio_path),
+        name="Test Podcast",
+        title="Test Episode",
+        category="interview",
+        publish_date=datetime.now(pytz.UTC)
+    )
+    
+    assert result == "# TLDR\n# The big picture\n# Highlights\n\n# Quoted\n# Worth your time if"
+    follow_up = mock_instance.generate_content.call_args[0][0]
+    assert follow_up[1] == {'role': 'model', 'parts': [partial_response.text]}
+    assert "Quoted, Worth your time if" in follow_up[2]['parts'][0]
+
+@patch('google.generativeai.upload_file')
+@patch('google.generativeai.get_file')
+@patch('google.generativeai.configure')
+@patch('google.generativeai.GenerativeModel')
+async def test_process_podcast_output_path_is_atomic(mock_model, mock_configure, mock_get_file,
+                                                     mock_upload_file, mock_api_key, tmp_path):
+    """Test output_path only ever holds a complete newsletter, even when the follow-up fails"""
+    def stream_of(text):
+        response = MagicMock()
+        response.__iter__.return_value = iter([MagicMock(parts=[MagicMock()], text=text)])
+        response.text = text
+        return response
+    
+    preanalysis_response = MagicMock()
+    preanalysis_response.text = "Insights"
+    partial = "# TLDR\n# The big picture\n# Highlights"
+    continuation = "# Quoted\n# Worth your time if"
+    mock_instance = MagicMock()
+    mock_model.return_value = mock_instance
+    mock_get_file.side_effect = NotFound("missing")
+    
+    audio_path = tmp_path / "episode.mp3"
+    audio_path.write_bytes(b"episode audio")
+    output_dir = tmp_path / "newsletters"
+    output_path = output_dir / "episode.md"
+    episode = dict(
+        audio_path=str(audio_path),
+        name="Test Podcast",
+        title="Test Episode",
+        category="interview",
+        publish_date=datetime.now(pytz.UTC),
+        output_path=str(output_path)
+    )
+    
+    analyzer = PodcastAnalyzer(mock_api_key)
+    mock_instance.generate_content.side_effect = [
+        preanalysis_response, stream_of(partial), ValueError("follow-up failed")
+    ]
+    with pytest.raises(AnalyzerError):
+        await analyzer.process_podcast(**episode)
+    assert list(output_dir.iterdir()) == []
+    
+    mock_instance.generate_content.side_effect = [
+        preanalysis_response, stream_of(partial), stream_of(continuation)
+    ]
+    result = await analyzer.process_podcast(**episode)
+    
+    assert result == f"{partial}\n\n{continuation}"
+    assert output_path.read_text(encoding="utf-8") == result
+    assert list(output_dir.iterdir()) == [output_path]
@@ -1,9 +1,12 @@
 import os
 import pytest
+import subprocess
 import tempfile
+import threading
+import time
 from unittest.mock import patch, MagicMock
 
-from src.utils.audio_transformer import transform_audio, AudioTransformationError
+from src.utils.audio_transformer import transform_audio, get_audio_length, chunk_audio, AudioTransformationError
 from src.utils.downloader import download_audio, DownloadError, FileSizeError
 
 def test_transform_audio_basic(mock_audio_file):
@@ -46,7 +49,126 @@ def test_transform_audio_custom_params(mock_audio_file):
     # Cleanup
     os.unlink(result_path)
 
-@patch('requests.get')
+@patch('subprocess.run')
+def test_transform_audio_ffmpeg_failure(mock_run, mock_audio_file):
+    """Test ffmpeg errors are reported and the partial output is removed"""
+    created = []
+    def fail(cmd, **kwargs):
+        created.append(cmd[-1])
+        raise subprocess.CalledProcessError(1, cmd, stderr=b"Invalid data found when processing input")
+    mock_run.side_effect = fail
+    
+    with pytest.raises(AudioTransformationError, match="Invalid data"):
+        transform_audio(mock_audio_file)
+    
+    cmd = mock_run.call_args[0][0]
+    assert cmd[0] == "ffmpeg"
+    assert cmd[cmd.index("-ac") + 1] == "1"
+    assert cmd[cmd.index("-ar") + 1] == "16000"
+    assert not os.path.exists(created[0])
+
+@patch('subprocess.run')
+def test_transform_audio_cache(mock_run, mock_audio_file):
+    """Test repeated transformations of the same audio reuse the cached output"""
+    def compress(cmd, **kwargs):
+        with open(cmd[-1], "wb") as f:
+            f.write(b"compressed audio")
+    mock_run.side_effect = compress
+    
+    first_path = transform_audio(mock_audio_file)
+    second_path = transform_audio(mock_audio_file)
+    
+    mock_run.assert_called_once()
+    assert first_path != second_path
+    with open(second_path, "rb") as f:
+        assert f.read() == b"compressed audio"
+    
+    # Returned files are copies, so changing one in place leaves the cache intact
+    assert not os.path.samefile(first_path, second_path)
+    with open(first_path, "r+b") as f:
+        f.truncate(0)
+    third_path = transform_audio(mock_audio_file)
+    with open(third_path, "rb") as f:
+        assert f.read() == b"compressed audio"
+    os.unlink(third_path)
+    
+    # Deleting a returned file leaves the cache intact
+    os.unlink(first_path)
+    os.unlink(second_path)
+    os.unlink(transform_audio(mock_audio_file, {'channels': 1, 'frame_rate': 8000, 'format': 'mp3', 'quality': '9'}))
+    assert mock_run.call_count == 2
+
+@patch('src.utils.audio_transformer.AUDIO_CACHE_MAX_BYTES', 40)
+@patch('subprocess.run')
+def test_transform_audio_cache_pruning(mock_run, mock_audio_file):
+    """Test the audio cache drops expired entries and evicts the least recently used ones"""
+    from src.utils import audio_transformer
+    
+    def compress(cmd, **kwargs):
+        with open(cmd[-1], "wb") as f:
+            f.write(b"compressed audio")  # 16 bytes, so two entries fit the limit
+    mock_run.side_effect = compress
+    
+    def params(frame_rate):
+        return {'channels': 1, 'frame_rate': frame_rate, 'format': 'mp3', 'quality': '9'}
+    
+    def cached_entries():
+        return sorted(os.listdir(audio_transformer.AUDIO_CACHE_DIR))
+    
+    os.unlink(transform_audio(mock_audio_file, params(8000)))
+    first_entry, = cached_entries()
+    os.unlink(transform_audio(mock_audio_file, params(16000)))
+    assert len(cached_entries()) == 2
+    
+    # Age the first entry, then reuse it so it becomes the most recently used before the cache overflows
+    first_path = os.path.join(audio_transformer.AUDIO_CACHE_DIR, first_entry)
+    os.utime(first_path, (time.time() - 60, time.time() - 60))
+    os.unlink(transform_audio(mock_audio_file, params(8000)))
+    os.unlink(transform_audio(mock_audio_file, params(22050)))
+    
+    assert len(cached_entries()) == 2
+    assert first_entry in cached_entries()
+    assert mock_run.call_count == 3
+    
+    # Entries past their age limit are dropped on the next store
+    os.utime(first_path, (0, 0))
+    os.unlink(transform_audio(mock_audio_file, params(44100)))
+    assert first_entry not in cached_entries()
+
+@patch('subprocess.run')
+def test_get_audio_length(mock_run):
+    """Test audio length comes from ffprobe's container duration"""
+    mock_run.return_value = MagicMock(stdout=b"1800.5\n")
+    
+    assert get_audio_length("episode.mp3") == pytest.approx(1800.5 / 60)
+    assert mock_run.call_args[0][0][0] == "ffprobe"
+    
+    mock_run.side_effect = subprocess.CalledProcessError(1, "ffprobe")
+    with pytest.raises(AudioTransformationError):
+        get_audio_length("episode.mp3")
+
+@patch('subprocess.run')
+def test_chunk_audio(mock_run):
+    """Test chunks are cut in one ffmpeg segment pass and returned in order"""
+    def segment(cmd, **kwargs):
+        pattern = cmd[-1]
+        for i in (2, 0, 1):
+            with open(pattern % i, "wb") as f:
+                f.write(b"chunk")
+    mock_run.side_effect = segment
+    
+    chunk_paths = chunk_audio("episode.mp3", chunk_minutes=20)
+    
+    mock_run.assert_called_once()
+    cmd = mock_run.call_args[0][0]
+    assert cmd[cmd.index("-segment_time") + 1] == "1200"
+    assert chunk_paths == sorted(chunk_paths) and len(chunk_paths) == 3
+    
+    # Cleanup
+    for path in chunk_paths:
+        os.unlink(path)
+
+@patch('requests.Session.get')
 def test_download_audio_success(mock_get):
     """Test successful audio download"""
     # Mock successful response
@@ -64,22 +186,88 @@ def test_download_audio_success(mock_get):
     # Cleanup
     os.unlink(result)
 
-@patch('requests.head')
-@patch('requests.get')
-def test_download_audio_size_limit(mock_get, mock_head):
+@patch('requests.Session.get')
+def test_download_audio_size_limit(mock_get):
     """Test download with file size exceeding limit"""
-    # Mock head response with large file size
-    mock_head_response = MagicMock()
-    mock_head_response.headers = {'content-length': str(500 * 1024 * 1024)}  # 500MB
-    mock_head.return_value = mock_head_response
-    
-    # Mock get response (shouldn't be called)
-    mock_get.return_value = MagicMock()
+    # Mock response with large file size
+    mock_response = MagicMock()
+    mock_response.headers = {'content-length': str(500 * 1024 * 1024)}  # 500MB
+    mock_get.return_value = mock_response
     
     with pytest.raises(FileSizeError):
         download_audio("http://example.com/large.mp3")
+    
+    # The body is never read
+    mock_get.assert_called_once()
+    mock_response.close.assert_called_once()
+    mock_response.iter_content.assert_not_called()
+
+@patch('src.utils.downloader.RANGE_DOWNLOAD_MIN_MB', 0)
+@patch('requests.Session.get')
+def test_download_audio_ranges(mock_get):
+    """Test servers that accept byte ranges are downloaded in parallel parts"""
+    data = os.urandom(1000)
+    
+    def get_range(url, headers=None, **kwargs):
+        if headers is None:
+            return MagicMock(headers={'content-length': str(len(data)), 'accept-ranges': 'bytes'})
+        start, end = map(int, headers['Range'][len('bytes='):].split('-'))
+        response = MagicMock(status_code=206)
+        response.__enter__.return_value = response
+        response.iter_content.return_value = [data[start:end + 1]]
+        return response
+    mock_get.side_effect = get_range
+    
+    result = download_audio("http://example.com/test.mp3")
+    
+    with open(result, 'rb') as f:
+        assert f.read() == data
+    assert mock_get.call_count > 1
+    
+    # Cleanup
+    os.unlink(result)
+
+@patch('src.utils.downloader.RANGE_DOWNLOAD_MIN_MB', 0)
+@patch('requests.Session.get')
+def test_download_audio_ranges_short_writes(mock_get):
+    """Test range chunks are written in full even when pwrite writes only part of them"""
+    data = os.urandom(1000)
+    
+    def get_range(url, headers=None, **kwargs):
+        if headers is None:
+            return MagicMock(headers={'content-length': str(len(data)), 'accept-ranges': 'bytes'})
+        start, end = map(int, headers['Range'][len('bytes='):].split('-'))
+        response = MagicMock(status_code=206)
+        response.__enter__.return_value = response
+        response.iter_content.return_value = [data[start:end + 1]]
+        return response
+    mock_get.side_effect = get_range
+    
+    real_pwrite = os.pwrite
+    with patch('os.pwrite', side_effect=lambda fd, buf, offset: real_pwrite(fd, buf[:7], offset)):
+        result = download_audio("http://example.com/test.mp3")
+    
+    with open(result, 'rb') as f:
+        assert f.read() == data
+    
+    # Cleanup
+    os.unlink(result)
+
+def test_download_sessions_per_thread():
+    """Test each thread downloads through its own session over one shared connection pool"""
+    from src.utils import downloader
+    
+    session = downloader._get_session()
+    other_sessions = []
+    thread = threading.Thread(target=lambda: other_sessions.append(downloader._get_session()))
+    thread.start()
+    thread.join()
+    
+    assert downloader._get_session() is session
+    assert other_sessions[0] is not session
+    assert other_sessions[0].get_adapter("https://example.com") is session.get_adapter("https://example.com")
 
-@patch('requests.get')
+@patch('requests.Session.get')
 def test_download_audio_network_error(mock_get):
     """Test download with network errors"""
     # Mock network error
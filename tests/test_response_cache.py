@@ -0,0 +1,24 @@
+import os
+import time
+
+from src.utils.response_cache import ResponseCache
+
+def test_response_cache_roundtrip(tmp_path):
+    """Test cached responses are returned until they expire"""
+    cache = ResponseCache(directory=str(tmp_path), ttl=60)
+    key = ResponseCache.make_key("model", "prompt", "audio-hash")
+    
+    assert cache.get(key) is None
+    cache.set(key, "Insights — with “unicode”")
+    assert cache.get(key) == "Insights — with “unicode”"
+    
+    # Keys depend on every part and on part boundaries
+    assert key != ResponseCache.make_key("model", "prompt", "other-hash")
+    assert ResponseCache.make_key("ab", "c") != ResponseCache.make_key("a", "bc")
+    
+    # Expired entries are removed
+    path = cache._path(key)
+    old = time.time() - 120
+    os.utime(path, (old, old))
+    assert cache.get(key) is None
+    assert not os.path.exists(path)
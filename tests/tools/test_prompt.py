@@ -13,14 +13,26 @@ from database.config import AsyncSessionLocal
 from database.models import Podcast
 from utils.audio_transformer import get_audio_length, chunk_audio
 from utils.logging_config import setup_logging
+from utils.response_cache import ResponseCache
 from utils.temp_file_context import download_audio_context
 
 logger = logging.getLogger(__name__)
 
 parser = argparse.ArgumentParser()
 parser.add_argument('-d', '--debug', action='store_true', help='Enable debug logging')
+parser.add_argument('audio', nargs='*',
+                    help='Local audio files to analyze as a batch (skips interactive selection)')
+parser.add_argument('-n', '--name', default='Local podcast', help='Podcast name for local audio files')
+parser.add_argument('--category', default='interview', choices=['interview', 'banter'],
+                    help='Podcast category for local audio files (default: interview)')
+parser.add_argument('-c', '--concurrency', type=int, default=4,
+                    help='Number of episodes to process concurrently (default: 4)')
+parser.add_argument('--no-cache', action='store_true',
+                    help='Always call Gemini instead of reusing cached pre-analyses')
 args = parser.parse_args()
 
+CHUNK_MINUTES = 20
+
 setup_logging(level="DEBUG" if args.debug else "INFO")
 load_dotenv()
 
@@ -76,6 +88,56 @@ def select_episode(episodes):
         except ValueError:
             print("Please enter a number.")
 
+def create_analyzer(api_key: str) -> PodcastAnalyzer:
+    """Create an analyzer that reuses cached pre-analyses unless --no-cache is given"""
+    return PodcastAnalyzer(api_key, response_cache=None if args.no_cache else ResponseCache())
+
+def prepare_chunks(audio_path: str) -> list:
+    """Chunk an audio file if it is longer than the chunk size"""
+    audio_length = get_audio_length(audio_path)
+    if audio_length <= CHUNK_MINUTES:
+        logger.info(f"{audio_path} length ({audio_length:.1f}m) <= chunk size ({CHUNK_MINUTES}m), skipping chunking")
+        return []
+    
+    logger.info(f"Creating {CHUNK_MINUTES}-minute chunks for {audio_path}...")
+    chunk_paths = chunk_audio(audio_path, CHUNK_MINUTES)
+    logger.info(f"Created {len(chunk_paths)} chunks")
+    return chunk_paths
+
+async def process_local_files(api_key: str, audio_paths: list):
+    """Analyze local audio files as one concurrent batch"""
+    chunk_lists = await asyncio.gather(
+        *(asyncio.to_thread(prepare_chunks, path) for path in audio_paths)
+    )
+    
+    items = [
+        {
+            'audio_path': path,
+            'name': args.name,
+            'title': os.path.splitext(os.path.basename(path))[0],
+            'category': args.category,
+            'publish_date': datetime.now(pytz.UTC),
+            'chunk_paths': chunk_paths
+        }
+        for path, chunk_paths in zip(audio_paths, chunk_lists)
+    ]
+    
+    analyzer = create_analyzer(api_key)
+    try:
+        results = await analyzer.analyze_audio_batch(items, max_concurrency=args.concurrency)
+    finally:
+        # Clean up chunk files if any were created
+        for chunk_paths in chunk_lists:
+            for path in chunk_paths:
+                if os.path.exists(path):
+                    os.unlink(path)
+    
+    for item, result in zip(items, results):
+        print(f"\nGenerated Newsletter: {item['audio_path']}")
+        print("=" * 80)
+        print(f"Error: {result}" if isinstance(result, Exception) else result)
+        print("=" * 80)
+
 async def main():
     """Test script for analyzing podcast episodes with Gemini"""
     try:
@@ -84,6 +146,11 @@ async def main():
         if not api_key:
             raise ValueError("GEMINI_API_KEY not found in environment variables or .env file")
         
+        # Local files given on the command line run as a batch, without prompts
+        if args.audio:
+            await process_local_files(api_key, args.audio)
+            return
+        
         # Select podcast
         logger.info("Getting podcast list...")
         podcast = await select_podcast()
@@ -109,19 +176,10 @@ async def main():
         # Download and chunk audio
         with download_audio_context(episode['url']) as downloaded_file:
             # Get audio length and create chunks if needed
-            audio_length = get_audio_length(downloaded_file)
-            chunk_minutes = 20
-            
-            if audio_length <= chunk_minutes:
-                logger.info(f"Episode length ({audio_length:.1f}m) <= chunk size ({chunk_minutes}m), skipping chunking")
-                chunk_paths = []
-            else:
-                logger.info(f"Creating {chunk_minutes}-minute chunks...")
-                chunk_paths = chunk_audio(downloaded_file, chunk_minutes)
-                logger.info(f"Created {len(chunk_paths)} chunks")
+            chunk_paths = prepare_chunks(downloaded_file)
             
             # Initialize analyzer
-            analyzer = PodcastAnalyzer(api_key)
+            analyzer = create_analyzer(api_key)
             
             # Process podcast with full audio and chunks (if any)
             newsletter = await analyzer.process_podcast(